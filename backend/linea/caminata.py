@@ -0,0 +1,380 @@
+"""
+Rutas a pie (tramos caminando hacia/desde paradas y entre transbordos).
+
+El grafo peatonal se carga una sola vez por proceso:
+    - desde un extracto OSM en XML (settings.CAMINATA_OSM, .osm u .osm.gz), o
+    - si no existe, desde las calles de las rutas de buses (LineasPuntos), como
+      sustituto local: son calles reales y sirven para pruebas sin descargar mapas.
+
+Los extremos se ajustan al nodo más cercano del grafo y el camino entre nodos
+se calcula con A*. Los resultados se guardan en un caché SQLite persistente
+(settings.CAMINATA_CACHE) indexado por los nodos ajustados, así que un mismo
+tramo no se recalcula aunque el proceso se reinicie. Al cargar un grafo nuevo
+se borran las filas de firmas anteriores.
+
+Para acotar el trabajo por solicitud, los tramos más largos que
+CAMINATA_DISTANCIA_MAX (en línea recta) no se buscan en el grafo, y A* se
+detiene tras expandir CAMINATA_MAX_NODOS nodos; en ambos casos el tramo se
+devuelve como línea recta.
+"""
+
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import os
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from django.conf import settings
+
+from .geo import METROS_POR_GRADO, haversine_m
+from .models import LineasPuntos
+
+
+# Vías por las que se puede caminar (etiqueta highway de OSM)
+VIAS_PEATONALES = {
+    'footway', 'pedestrian', 'path', 'steps', 'living_street', 'residential',
+    'service', 'unclassified', 'tertiary', 'tertiary_link', 'secondary',
+    'secondary_link', 'primary', 'primary_link', 'track', 'crossing', 'corridor',
+    'road',
+}
+
+
+class GrafoPeatonal:
+    """Grafo no dirigido de nodos (lat, lon) con aristas en metros."""
+
+    def __init__(self, latitudes, longitudes, aristas, fuente, firma):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        # Copias como listas de Python para A* (indexar floats nativos es más rápido que numpy)
+        self._lista_lat = self.latitudes.tolist()
+        self._lista_lon = self.longitudes.tolist()
+        self.fuente = fuente  # 'osm' o 'rutas'
+        self.firma = firma    # identifica la versión del grafo en el caché
+
+        self.vecinos = [[] for _ in range(len(self.latitudes))]
+        if aristas:
+            a, b = np.array(aristas).T
+            largos = haversine_m(self.latitudes[a], self.longitudes[a], self.latitudes[b], self.longitudes[b])
+            for u, v, largo in zip(a.tolist(), b.tolist(), largos.tolist()):
+                self.vecinos[u].append((v, largo))
+                self.vecinos[v].append((u, largo))
+
+        # Índice de celdas para ajustar coordenadas al nodo más cercano
+        self.tamano_celda = 0.002  # grados (~220 m)
+        self.celdas = {}
+        conectados = [i for i, v in enumerate(self.vecinos) if v]
+        for i in conectados:
+            self.celdas.setdefault(self._celda(self.latitudes[i], self.longitudes[i]), []).append(i)
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def _celda(self, lat, lon):
+        return (int(lat // self.tamano_celda), int(lon // self.tamano_celda))
+
+    # ----- Construcción -----
+
+    @classmethod
+    def desde_osm(cls, ruta):
+        """Lee nodos y vías peatonales de un extracto OSM en XML."""
+        abrir = gzip.open if str(ruta).endswith('.gz') else open
+        nodos = {}
+        vias = []
+        with abrir(ruta, 'rb') as archivo:
+            for _, elemento in ET.iterparse(archivo, events=('end',)):
+                if elemento.tag == 'node':
+                    nodos[elemento.get('id')] = (float(elemento.get('lat')), float(elemento.get('lon')))
+                    elemento.clear()
+                elif elemento.tag == 'way':
+                    etiquetas = {t.get('k'): t.get('v') for t in elemento.iter('tag')}
+                    if etiquetas.get('highway') in VIAS_PEATONALES and etiquetas.get('foot') != 'no' \
+                            and etiquetas.get('access') not in ('no', 'private'):
+                        vias.append([nd.get('ref') for nd in elemento.iter('nd')])
+                    elemento.clear()
+
+        indices = {}
+        latitudes, longitudes, aristas = [], [], []
+        for via in vias:
+            anterior = None
+            for ref in via:
+                if ref not in nodos:
+                    anterior = None
+                    continue
+                if ref not in indices:
+                    indices[ref] = len(latitudes)
+                    latitudes.append(nodos[ref][0])
+                    longitudes.append(nodos[ref][1])
+                actual = indices[ref]
+                if anterior is not None and anterior != actual:
+                    aristas.append((anterior, actual))
+                anterior = actual
+
+        estado = os.stat(ruta)
+        firma = f'osm:{os.path.basename(ruta)}:{estado.st_size}:{int(estado.st_mtime)}'
+        return cls(latitudes, longitudes, aristas, 'osm', firma)
+
+    @classmethod
+    def desde_rutas(cls):
+        """Sustituto local: las calles recorridas por los buses, en ambos sentidos."""
+        filas = list(
+            LineasPuntos.objects
+            .order_by('idLineaRuta_id', 'orden')
+            .values_list('idLineaRuta_id', 'idPunto_id', 'latitud', 'longitud')
+        )
+        indices = {}
+        latitudes, longitudes, aristas = [], [], []
+        ruta_anterior = anterior = None
+        for id_ruta, id_punto, lat, lon in filas:
+            if id_punto not in indices:
+                indices[id_punto] = len(latitudes)
+                latitudes.append(lat)
+                longitudes.append(lon)
+            actual = indices[id_punto]
+            if id_ruta == ruta_anterior and anterior != actual:
+                aristas.append((anterior, actual))
+            ruta_anterior, anterior = id_ruta, actual
+
+        firma = 'rutas:' + hashlib.sha1(repr(filas).encode()).hexdigest()[:16]
+        return cls(latitudes, longitudes, aristas, 'rutas', firma)
+
+    # ----- Consultas -----
+
+    def nodo_cercano(self, lat, lon, radio_max=1000.0):
+        """Nodo conectado más cercano (o None si no hay ninguno a menos de radio_max metros)."""
+        ci, cj = self._celda(lat, lon)
+        lado = self.tamano_celda * METROS_POR_GRADO
+        alcance_max = int(np.ceil(radio_max / lado)) + 1
+        for alcance in range(1, alcance_max + 1):
+            candidatos = self._nodos_en(ci, cj, alcance, alcance)
+            if not candidatos:
+                continue
+            # El primer anillo con nodos no garantiza el más cercano: uno en el
+            # anillo siguiente puede estar más cerca (y en longitud las celdas
+            # miden menos metros). Se revisa todo lo que está a la distancia
+            # del mejor candidato, y al menos un anillo más.
+            _, distancia = self._mas_cercano(lat, lon, candidatos)
+            alcance_lat = max(alcance + 1, int(np.ceil(distancia / lado)) + 1)
+            alcance_lon = max(alcance + 1, int(np.ceil(distancia / (lado * max(math.cos(math.radians(lat)), 0.01)))) + 1)
+            nodo, distancia = self._mas_cercano(lat, lon, self._nodos_en(ci, cj, alcance_lat, alcance_lon))
+            return (nodo, distancia) if distancia <= radio_max else None
+        return None
+
+    def _nodos_en(self, ci, cj, alcance_lat, alcance_lon):
+        return [
+            i
+            for di in range(-alcance_lat, alcance_lat + 1)
+            for dj in range(-alcance_lon, alcance_lon + 1)
+            for i in self.celdas.get((ci + di, cj + dj), ())
+        ]
+
+    def _mas_cercano(self, lat, lon, candidatos):
+        candidatos = np.array(candidatos)
+        distancias = haversine_m(lat, lon, self.latitudes[candidatos], self.longitudes[candidatos])
+        k = int(np.argmin(distancias))
+        return int(candidatos[k]), float(distancias[k])
+
+    def camino(self, origen, destino, max_nodos=None):
+        """
+        A* entre dos nodos. Devuelve (metros, [nodos]) o None si no están
+        conectados o si se expandieron más de `max_nodos` nodos sin llegar.
+        """
+        if origen == destino:
+            return 0.0, [origen]
+
+        # Heurística: distancia equirectangular en metros (levemente reducida para no sobreestimar)
+        latitudes, longitudes = self._lista_lat, self._lista_lon
+        lat_d, lon_d = latitudes[destino], longitudes[destino]
+        escala_lon = math.cos(math.radians(lat_d))
+        metros = float(METROS_POR_GRADO) * 0.99
+
+        def heuristica(n):
+            return metros * math.hypot(latitudes[n] - lat_d, (longitudes[n] - lon_d) * escala_lon)
+
+        abiertos = [(heuristica(origen), 0.0, origen)]
+        costo = {origen: 0.0}
+        previo = {}
+        expandidos = 0
+        while abiertos:
+            _, g, nodo = heapq.heappop(abiertos)
+            if nodo == destino:
+                camino = [nodo]
+                while nodo in previo:
+                    nodo = previo[nodo]
+                    camino.append(nodo)
+                return g, camino[::-1]
+            if g > costo.get(nodo, float('inf')):
+                continue
+            expandidos += 1
+            if max_nodos is not None and expandidos > max_nodos:
+                return None
+            for vecino, largo in self.vecinos[nodo]:
+                nuevo = g + largo
+                if nuevo < costo.get(vecino, float('inf')):
+                    costo[vecino] = nuevo
+                    previo[vecino] = nodo
+                    heapq.heappush(abiertos, (nuevo + heuristica(vecino), nuevo, vecino))
+        return None
+
+
+class CacheCaminata:
+    """Caché persistente en SQLite: (firma del grafo, nodo A, nodo B) -> camino."""
+
+    def __init__(self, ruta):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute(
+            'CREATE TABLE IF NOT EXISTS tramos ('
+            ' firma TEXT, nodo_a INTEGER, nodo_b INTEGER, distancia REAL, nodos TEXT,'
+            ' PRIMARY KEY (firma, nodo_a, nodo_b))'
+        )
+        self._conexion.commit()
+
+    def obtener(self, firma, claves):
+        """Devuelve {(a, b): (distancia, nodos)} para las claves que estén en caché."""
+        encontrados = {}
+        with self._lock:
+            for a, b in claves:
+                fila = self._conexion.execute(
+                    'SELECT distancia, nodos FROM tramos WHERE firma = ? AND nodo_a = ? AND nodo_b = ?',
+                    (firma, a, b),
+                ).fetchone()
+                if fila is not None:
+                    encontrados[(a, b)] = (fila[0], json.loads(fila[1]) if fila[1] else None)
+        return encontrados
+
+    def purgar(self, firma):
+        """Borra los tramos de otros grafos (cada edición de rutas cambia la firma)."""
+        with self._lock:
+            borrados = self._conexion.execute('DELETE FROM tramos WHERE firma != ?', (firma,)).rowcount
+            self._conexion.commit()
+        return borrados
+
+    def guardar(self, firma, resultados):
+        with self._lock:
+            self._conexion.executemany(
+                'INSERT OR REPLACE INTO tramos VALUES (?, ?, ?, ?, ?)',
+                [
+                    (firma, a, b, distancia, json.dumps(nodos) if nodos else None)
+                    for (a, b), (distancia, nodos) in resultados.items()
+                ],
+            )
+            self._conexion.commit()
+
+
+class RouterCaminata:
+    def __init__(self, grafo, cache, velocidad_kmh, distancia_max=3000.0, max_nodos=50000):
+        self.grafo = grafo
+        self.cache = cache
+        self.metros_por_segundo = velocidad_kmh / 3.6
+        self.distancia_max = distancia_max  # metros en línea recta; más lejos no se busca en el grafo
+        self.max_nodos = max_nodos          # nodos que A* puede expandir por tramo
+
+    def rutas(self, tramos):
+        """
+        Calcula un lote de tramos [(lat_o, lon_o, lat_d, lon_d), ...]. Los caminos
+        entre nodos se resuelven una sola vez por lote y se buscan primero en el caché.
+        """
+        ajustes = []
+        pendientes = set()
+        for lat_o, lon_o, lat_d, lon_d in tramos:
+            if haversine_m(lat_o, lon_o, lat_d, lon_d) > self.distancia_max:
+                ajustes.append((None, None))  # demasiado lejos para caminar: línea recta
+                continue
+            o = self.grafo.nodo_cercano(lat_o, lon_o)
+            d = self.grafo.nodo_cercano(lat_d, lon_d)
+            ajustes.append((o, d))
+            if o is not None and d is not None:
+                pendientes.add((min(o[0], d[0]), max(o[0], d[0])))  # caminar es simétrico
+
+        caminos = self.cache.obtener(self.grafo.firma, pendientes)
+        nuevos = {}
+        for clave in pendientes - caminos.keys():
+            resultado = self.grafo.camino(*clave, max_nodos=self.max_nodos)
+            nuevos[clave] = resultado if resultado is not None else (None, None)
+        if nuevos:
+            self.cache.guardar(self.grafo.firma, nuevos)
+            caminos.update(nuevos)
+
+        return [
+            self._armar_tramo(tramo, o, d, caminos)
+            for tramo, (o, d) in zip(tramos, ajustes)
+        ]
+
+    def _armar_tramo(self, tramo, o, d, caminos):
+        lat_o, lon_o, lat_d, lon_d = tramo
+        directo = float(haversine_m(lat_o, lon_o, lat_d, lon_d))
+        # Si ir hasta el grafo ya cuesta más que la línea recta, el tramo es trivial
+        if o is not None and d is not None and o[1] + d[1] < directo:
+            distancia, nodos = caminos[(min(o[0], d[0]), max(o[0], d[0]))]
+            if nodos is not None:
+                if nodos[0] != o[0]:
+                    nodos = nodos[::-1]
+                geometria = [[lat_o, lon_o]]
+                geometria += [[float(self.grafo.latitudes[n]), float(self.grafo.longitudes[n])] for n in nodos]
+                geometria.append([lat_d, lon_d])
+                total = distancia + o[1] + d[1]
+                return self._tramo(total, geometria, self.grafo.fuente)
+
+        # Sin grafo que cubra el tramo (o fuera de los límites de búsqueda): línea recta
+        return self._tramo(directo, [[lat_o, lon_o], [lat_d, lon_d]], 'linea_recta')
+
+    def _tramo(self, distancia, geometria, fuente):
+        return {
+            'distancia': round(distancia, 1),                       # metros
+            'duracion': round(distancia / self.metros_por_segundo),  # segundos
+            'geometria': geometria,                                 # [[lat, lon], ...]
+            'fuente': fuente,
+        }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def archivo_osm():
+    """CAMINATA_OSM o, si no existe, su versión comprimida (<archivo>.gz)."""
+    for ruta in (settings.CAMINATA_OSM, settings.CAMINATA_OSM + '.gz'):
+        if os.path.exists(ruta):
+            return ruta
+    return None
+
+
+def obtener_router():
+    """Router del proceso; el grafo se carga en el primer uso."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                ruta_osm = archivo_osm()
+                if ruta_osm:
+                    grafo = GrafoPeatonal.desde_osm(ruta_osm)
+                else:
+                    grafo = GrafoPeatonal.desde_rutas()
+                cache = CacheCaminata(settings.CAMINATA_CACHE)
+                cache.purgar(grafo.firma)
+                _router = RouterCaminata(
+                    grafo,
+                    cache,
+                    settings.CAMINATA_VELOCIDAD_KMH,
+                    distancia_max=settings.CAMINATA_DISTANCIA_MAX,
+                    max_nodos=settings.CAMINATA_MAX_NODOS,
+                )
+    return _router
+
+
+def reiniciar_router(fuente=None):
+    """
+    Descarta el grafo cargado. Con `fuente` solo lo descarta si proviene de ella
+    (p. ej. 'rutas' cuando cambia la geometría usada como sustituto).
+    """
+    global _router
+    with _router_lock:
+        if _router is not None and (fuente is None or _router.grafo.fuente == fuente):
+            _router = None
@@ -0,0 +1,119 @@
+"""
+Derivación de distancias y tiempos de las rutas.
+
+Unidades (las mismas que usa DatosLineas.xlsx):
+    - LineasPuntos.distancia: metros desde el punto anterior de la ruta (0 en el primero)
+    - LineasPuntos.tiempo:    minutos para recorrer ese segmento
+    - LineasPuntos.distanciaAcumulada: metros desde el inicio de la ruta (suma de
+                              las distancias de la ruta hasta ese punto; siempre derivada)
+    - LineaRuta.distancia:    kilómetros totales de la ruta
+    - LineaRuta.tiempo:       horas totales de la ruta
+
+Todas las rutas se calculan en una sola pasada vectorizada sobre los puntos
+ordenados por (ruta, orden) y se guardan con bulk_update.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .geo import haversine_m
+from .models import LineaRuta, LineasPuntos
+
+
+def calcular_segmentos(rutas, latitudes, longitudes):
+    """
+    Recibe arreglos alineados y ordenados por (ruta, orden). Devuelve:
+        segmentos: metros desde el punto anterior de la misma ruta
+        acumulado: metros desde el inicio de la ruta
+        inicios:   índice del primer punto de cada ruta
+    """
+    rutas = np.asarray(rutas)
+    segmentos = np.zeros(len(rutas), dtype=np.float64)
+    if len(rutas) == 0:
+        return segmentos, segmentos.copy(), np.zeros(0, dtype=np.intp)
+
+    segmentos[1:] = haversine_m(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+    inicios = np.flatnonzero(np.r_[True, rutas[1:] != rutas[:-1]])
+    segmentos[inicios] = 0.0
+    return segmentos, acumular(segmentos, inicios), inicios
+
+
+def acumular(segmentos, inicios):
+    """
+    Suma acumulada de `segmentos` por ruta: vale 0 en cada índice de `inicios`
+    (el valor del primer punto de una ruta no se suma).
+    """
+    acumulado = np.cumsum(segmentos)
+    acumulado -= np.repeat(acumulado[inicios], np.diff(np.r_[inicios, len(segmentos)]))
+    return acumulado
+
+
+def derivar_distancias(sobrescribir=False, velocidad_kmh=None, rutas=None):
+    """
+    Completa distancia/tiempo de LineasPuntos y LineaRuta. Por defecto solo
+    rellena los valores nulos; con `sobrescribir=True` recalcula todos.
+    distanciaAcumulada se recalcula siempre a partir de las distancias finales.
+    `rutas` limita el cálculo a un conjunto de ids de LineaRuta.
+
+    Devuelve un resumen con la cantidad de filas actualizadas.
+    """
+    velocidad_kmh = velocidad_kmh or settings.VELOCIDAD_PROMEDIO_KMH
+    metros_por_minuto = velocidad_kmh * 1000.0 / 60.0
+
+    puntos = LineasPuntos.objects.order_by('idLineaRuta_id', 'orden', 'id')
+    if rutas is not None:
+        puntos = puntos.filter(idLineaRuta_id__in=rutas)
+    filas = list(puntos.values_list(
+        'id', 'idLineaRuta_id', 'latitud', 'longitud', 'distancia', 'tiempo', 'distanciaAcumulada',
+    ))
+    if not filas:
+        return {'puntos': 0, 'rutas': 0}
+
+    ids, ids_ruta, lats, lons, distancias, tiempos, acumulados = zip(*filas)
+    ids_ruta = np.array(ids_ruta)
+    segmentos, acumulado, inicios = calcular_segmentos(
+        ids_ruta, np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64),
+    )
+    # None -> NaN para poder enmascarar los nulos en bloque
+    distancias = np.array(distancias, dtype=np.float64)
+    tiempos = np.array(tiempos, dtype=np.float64)
+    acumulados = np.array(acumulados, dtype=np.float64)
+
+    # ----- LineasPuntos -----
+    nueva_distancia = np.where(sobrescribir | np.isnan(distancias), np.round(segmentos, 2), distancias)
+    nuevo_tiempo = np.where(sobrescribir | np.isnan(tiempos), np.round(nueva_distancia / metros_por_minuto, 2), tiempos)
+    nuevo_acumulado = np.round(acumular(nueva_distancia, inicios), 2)
+    cambiados = np.flatnonzero(
+        (nueva_distancia != distancias) | (nuevo_tiempo != tiempos) | (nuevo_acumulado != acumulados)
+    )
+
+    objetos = [
+        LineasPuntos(
+            id=ids[k],
+            distancia=float(nueva_distancia[k]),
+            tiempo=float(nuevo_tiempo[k]),
+            distanciaAcumulada=float(nuevo_acumulado[k]),
+        )
+        for k in cambiados
+    ]
+
+    # ----- LineaRuta -----
+    totales_km = acumulado[np.r_[inicios[1:] - 1, len(acumulado) - 1]] / 1000.0
+    totales = dict(zip(ids_ruta[inicios].tolist(), totales_km.tolist()))
+    rutas_actualizadas = []
+    for ruta in LineaRuta.objects.filter(id__in=totales.keys()).only('id', 'distancia', 'tiempo'):
+        distancia, tiempo = ruta.distancia, ruta.tiempo
+        if sobrescribir or distancia is None:
+            distancia = round(totales[ruta.id], 2)
+        if sobrescribir or tiempo is None:
+            tiempo = round(distancia / velocidad_kmh, 2)
+        if (distancia, tiempo) != (ruta.distancia, ruta.tiempo):
+            ruta.distancia, ruta.tiempo = distancia, tiempo
+            rutas_actualizadas.append(ruta)
+
+    with transaction.atomic():
+        LineasPuntos.objects.bulk_update(objetos, ['distancia', 'tiempo', 'distanciaAcumulada'], batch_size=1000)
+        LineaRuta.objects.bulk_update(rutas_actualizadas, ['distancia', 'tiempo'], batch_size=1000)
+
+    return {'puntos': len(objetos), 'rutas': len(rutas_actualizadas)}
@@ -0,0 +1,157 @@
+"""
+Lectura/escritura de las cuatro tablas de la red en Excel, Parquet o Arrow IPC.
+
+Las columnas usan los mismos nombres que las hojas de DatosLineas.xlsx, así que
+cualquier formato se carga con el mismo código de cargarDatos.
+
+    - excel:   un solo libro DatosLineas.xlsx con una hoja por tabla
+    - parquet: <directorio>/<Tabla>.parquet (leído con memory_map)
+    - arrow:   <directorio>/<Tabla>.arrow, formato IPC sin compresión, se lee por
+               memory-map y las columnas numéricas se obtienen sin copiar
+
+pyarrow solo se importa al usar parquet/arrow.
+"""
+
+import os
+
+import pandas as pd
+
+from .models import Lineas, Puntos, LineaRuta, LineasPuntos
+
+
+TABLAS = ('Lineas', 'Puntos', 'LineaRuta', 'LineasPuntos')
+FORMATOS = ('excel', 'parquet', 'arrow')
+EXTENSIONES = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Columna de la hoja -> campo del modelo
+COLUMNAS = {
+    'Lineas': (Lineas, {
+        'IdLinea': 'id',
+        'NombreLinea': 'nombreLinea',
+        'ColorLinea': 'colorLinea',
+        'ImagenMicrobus': 'imagenLinea',
+        'FechaCreacion': 'fechaCreacion',
+    }),
+    'Puntos': (Puntos, {
+        'IdPunto': 'id',
+        'Latitud': 'latitud',
+        'Longitud': 'longitud',
+        'Descripcion': 'descripcion',
+    }),
+    'LineaRuta': (LineaRuta, {
+        'IdLineaRuta': 'id',
+        'IdLinea': 'idlinea_id',
+        'IdRuta': 'idRuta',
+        'Descripcion': 'descripcion',
+        'Distancia': 'distancia',
+        'Tiempo': 'tiempo',
+    }),
+    'LineasPuntos': (LineasPuntos, {
+        'IdLineaPunto': 'id',
+        'IdLineaRuta': 'idLineaRuta_id',
+        'IdPunto': 'idPunto_id',
+        'Orden': 'orden',
+        'Latitud': 'latitud',
+        'Longitud': 'longitud',
+        'Distancia': 'distancia',
+        'Tiempo': 'tiempo',
+    }),
+}
+
+
+def ruta_tabla(directorio, nombre, formato):
+    return os.path.join(directorio, nombre + EXTENSIONES[formato])
+
+
+class FuenteTablas:
+    """Origen de datos para cargarDatos: devuelve cada tabla como columnas."""
+
+    def __init__(self, formato, ruta, engine=None):
+        self.formato = formato
+        self.ruta = ruta        # libro Excel o directorio con los archivos
+        self.engine = engine    # solo Excel: openpyxl / xlrd
+        self._hojas = None      # solo Excel: el libro se lee una vez para las cuatro hojas
+
+    def __str__(self):
+        return self.ruta
+
+    def columnas(self, nombre):
+        """
+        {columna: valores} de una tabla. Las columnas numéricas se devuelven como
+        arreglos numpy (float64 con NaN en los nulos) y las de texto como listas
+        con None en los nulos.
+        """
+        if self.formato == 'excel':
+            if self._hojas is None:
+                self._hojas = pd.read_excel(self.ruta, sheet_name=list(TABLAS), engine=self.engine)
+            df = self._hojas[nombre]
+            return {c: _columna_pandas(df[c]) for c in df.columns}
+        tabla = leer_arrow(self.ruta, nombre, self.formato)
+        return {c: _columna_arrow(tabla.column(c)) for c in tabla.column_names}
+
+
+def _columna_pandas(serie):
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return serie.to_numpy()
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def _columna_arrow(columna):
+    import pyarrow.types as pt
+
+    if pt.is_integer(columna.type) or pt.is_floating(columna.type):
+        # Sin nulos y en un solo bloque, el arreglo apunta al buffer del
+        # memory-map (no se copia); con nulos pyarrow lo convierte a float64/NaN
+        return columna.to_numpy()
+    return columna.to_pylist()
+
+
+def leer_arrow(directorio, nombre, formato):
+    """Lee una tabla Parquet/Arrow como pyarrow.Table, por memory-map."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    ruta = ruta_tabla(directorio, nombre, formato)
+    if formato == 'parquet':
+        return pq.read_table(ruta, memory_map=True)
+    with pa.memory_map(ruta, 'r') as archivo:
+        return pa.ipc.open_file(archivo).read_all()
+
+
+def tablas_desde_bd():
+    """Las cuatro tablas como {nombre: {columna: lista de valores}}."""
+    tablas = {}
+    for nombre, (modelo, columnas) in COLUMNAS.items():
+        filas = list(modelo.objects.order_by('id').values_list(*columnas.values()))
+        valores = list(zip(*filas)) if filas else [()] * len(columnas)
+        tablas[nombre] = {columna: list(v) for columna, v in zip(columnas, valores)}
+    return tablas
+
+
+def escribir_tablas(tablas, formato, destino):
+    """
+    Escribe las tablas en `destino` (libro .xlsx para excel, directorio para
+    parquet/arrow). Devuelve la lista de archivos escritos.
+    """
+    if formato == 'excel':
+        with pd.ExcelWriter(destino, engine='openpyxl') as libro:
+            for nombre, columnas in tablas.items():
+                pd.DataFrame(columnas).to_excel(libro, sheet_name=nombre, index=False)
+        return [destino]
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(destino, exist_ok=True)
+    archivos = []
+    for nombre, columnas in tablas.items():
+        tabla = pa.table({columna: pa.array(valores) for columna, valores in columnas.items()})
+        ruta = ruta_tabla(destino, nombre, formato)
+        if formato == 'parquet':
+            pq.write_table(tabla, ruta)
+        else:
+            # Sin compresión para que la lectura por memory-map no copie los buffers
+            with pa.OSFile(ruta, 'wb') as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+        archivos.append(ruta)
+    return archivos
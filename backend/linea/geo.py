@@ -0,0 +1,40 @@
+"""
+Utilidades geográficas vectorizadas con NumPy.
+
+Todas las funciones aceptan escalares o arreglos y operan elemento a elemento,
+para poder procesar rutas completas (o lotes de posiciones) en una sola pasada.
+"""
+
+import numpy as np
+
+RADIO_TIERRA_M = 6371008.8  # radio medio de la Tierra en metros
+METROS_POR_GRADO = np.pi * RADIO_TIERRA_M / 180.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Distancia geodésica (haversine) en metros entre pares de coordenadas."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * RADIO_TIERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def a_plano(lat, lon, lat0, lon0):
+    """
+    Proyección equirectangular local (en metros) alrededor de (lat0, lon0).
+    Suficientemente precisa para distancias urbanas de unos pocos kilómetros.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = (lon - lon0) * METROS_POR_GRADO * np.cos(np.radians(lat0))
+    y = (lat - lat0) * METROS_POR_GRADO
+    return x, y
+
+
+def desde_plano(x, y, lat0, lon0):
+    """Inversa de `a_plano`: metros locales -> (latitud, longitud)."""
+    lat = lat0 + np.asarray(y, dtype=np.float64) / METROS_POR_GRADO
+    lon = lon0 + np.asarray(x, dtype=np.float64) / (METROS_POR_GRADO * np.cos(np.radians(lat0)))
+    return lat, lon
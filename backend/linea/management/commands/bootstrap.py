@@ -0,0 +1,130 @@
+"""
+Comando de arranque del contenedor: hace en un solo proceso lo que antes
+inicio.sh hacía con varios `manage.py` (cada uno reimportando el proyecto).
+
+Ubicación: linea/management/commands/bootstrap.py
+
+Uso:
+    python manage.py bootstrap
+    python manage.py bootstrap --precalentar                 # deriva distancias y carga geometrías y grafo peatonal
+    python manage.py bootstrap --precalentar --servir 0.0.0.0:8000   # y sirve con uvicorn en el mismo proceso
+
+inicio.sh (desarrollo) solo ejecuta `bootstrap` y luego `uvicorn --reload`; --servir
+es para producción, donde los cachés precalentados deben quedar en el servidor.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+
+class Command(BaseCommand):
+    help = 'Espera la base de datos, aplica migraciones, asegura el superusuario y opcionalmente precalienta cachés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--espera-maxima', type=float, default=60.0, help='Segundos máximos esperando la base de datos')
+        parser.add_argument('--sin-makemigrations', action='store_true', help='No generar migraciones nuevas')
+        parser.add_argument('--precalentar', action='store_true', help='Derivar distancias y cargar cachés de rutas y del grafo peatonal')
+        parser.add_argument('--servir', metavar='HOST:PUERTO', help='Al terminar, servir la app ASGI con uvicorn en este proceso')
+
+    def handle(self, *args, **options):
+        self.tiempos = []
+        inicio = time.perf_counter()
+
+        with self.etapa('Base de datos'):
+            self.esperar_base_datos(options['espera_maxima'])
+
+        if not options['sin_makemigrations']:
+            with self.etapa('makemigrations'):
+                call_command('makemigrations', interactive=False, verbosity=0)
+
+        with self.etapa('migrate'):
+            call_command('migrate', interactive=False, verbosity=0)
+
+        with self.etapa('Superusuario'):
+            self.asegurar_superusuario()
+
+        if options['precalentar']:
+            with self.etapa('Precalentar'):
+                self.precalentar()
+
+        self.tiempos.append(('Total', time.perf_counter() - inicio))
+        self.stdout.write('\n⏱️ Tiempos de arranque:')
+        for nombre, segundos in self.tiempos:
+            self.stdout.write(f'  {nombre:<16} {segundos:7.2f}s')
+
+        if options['servir']:
+            self.servir(options['servir'])
+
+    @contextmanager
+    def etapa(self, nombre):
+        t0 = time.perf_counter()
+        yield
+        self.tiempos.append((nombre, time.perf_counter() - t0))
+
+    def esperar_base_datos(self, espera_maxima):
+        """Reintenta la conexión con backoff exponencial (0.25s, 0.5s, ... hasta 5s)."""
+        limite = time.monotonic() + espera_maxima
+        pausa = 0.25
+        while True:
+            try:
+                connection.ensure_connection()
+                self.stdout.write(self.style.SUCCESS('✓ Base de datos disponible'))
+                return
+            except OperationalError as e:
+                connection.close()
+                if time.monotonic() + pausa > limite:
+                    raise CommandError(f'La base de datos no respondió en {espera_maxima:.0f}s: {e}')
+                self.stdout.write(f'Esperando a que la base de datos esté lista... ({pausa:.2f}s)')
+                time.sleep(pausa)
+                pausa = min(pausa * 2, 5.0)
+
+    def asegurar_superusuario(self):
+        username = os.getenv('DJANGO_SUPERUSER_USERNAME')
+        if not username:
+            self.stdout.write(self.style.WARNING('⚠ DJANGO_SUPERUSER_USERNAME no definido, saltando...'))
+            return
+
+        User = get_user_model()
+        if User.objects.filter(username=username).exists():
+            self.stdout.write('✅ Superusuario ya existe.')
+            return
+
+        User.objects.create_superuser(
+            username,
+            os.getenv('DJANGO_SUPERUSER_EMAIL', ''),
+            os.getenv('DJANGO_SUPERUSER_PASSWORD'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Superusuario creado: {username}'))
+
+    def precalentar(self):
+        from linea.caminata import obtener_router
+        from linea.distancias import derivar_distancias
+        from linea.red import invalidar_red, sincronizar_red
+        from linea.tiempo_real import registro
+
+        resumen = derivar_distancias()
+        self.stdout.write(f'  Distancias: {resumen["puntos"]} puntos y {resumen["rutas"]} rutas completados')
+        if resumen['puntos'] or resumen['rutas']:
+            invalidar_red()
+        else:
+            sincronizar_red(forzar=True)  # registra la versión con la que se llenan los cachés
+
+        geometrias = registro.precargar_geometrias()
+        self.stdout.write(f'  Geometrías en memoria: {len(geometrias)} rutas')
+
+        grafo = obtener_router().grafo
+        self.stdout.write(f'  Grafo peatonal ({grafo.fuente}): {len(grafo)} nodos')
+
+    def servir(self, direccion):
+        import uvicorn
+        from planificador_viajes.asgi import application
+
+        host, _, puerto = direccion.rpartition(':')
+        self.stdout.write(self.style.SUCCESS(f'\n🚀 Sirviendo en {host or "0.0.0.0"}:{puerto}'))
+        uvicorn.run(application, host=host or '0.0.0.0', port=int(puerto), lifespan='off')
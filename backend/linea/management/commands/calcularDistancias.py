@@ -0,0 +1,40 @@
+"""
+Comando para calcular distancias y tiempos de LineasPuntos y LineaRuta
+a partir de las coordenadas (haversine), en una sola pasada vectorizada.
+
+Ubicación: linea/management/commands/calcularDistancias.py
+
+Uso:
+    python manage.py calcularDistancias                  # solo completa valores nulos
+    python manage.py calcularDistancias --sobrescribir   # recalcula todo
+    python manage.py calcularDistancias --velocidad 18   # km/h para estimar tiempos
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from linea.distancias import derivar_distancias
+from linea.red import invalidar_red
+
+
+class Command(BaseCommand):
+    help = 'Calcula distancias y tiempos de las rutas a partir de sus coordenadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sobrescribir', action='store_true', help='Recalcular también los valores existentes')
+        parser.add_argument('--velocidad', type=float, help='Velocidad promedio en km/h (por defecto VELOCIDAD_PROMEDIO_KMH)')
+        parser.add_argument('--ruta', type=int, action='append', help='Limitar a una LineaRuta (se puede repetir)')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resumen = derivar_distancias(
+            sobrescribir=options['sobrescribir'],
+            velocidad_kmh=options['velocidad'],
+            rutas=options['ruta'],
+        )
+        if resumen['puntos'] or resumen['rutas']:
+            invalidar_red()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {resumen["puntos"]} puntos y {resumen["rutas"]} rutas actualizados '
+            f'en {time.perf_counter() - inicio:.2f}s'
+        ))
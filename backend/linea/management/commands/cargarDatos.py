@@ -1,202 +1,301 @@
 """
 Comando para cargar datos iniciales desde DatosLineas.xls
+(o desde archivos Parquet/Arrow generados con exportarDatos)
 
 Ubicación: linea/management/commands/cargarDatos.py
 
 Uso:
     python manage.py cargarDatos
+    python manage.py cargarDatos --sin-derivar   # no calcular distancias/tiempos faltantes
+    python manage.py cargarDatos --formato parquet --directorio datos
+    python manage.py cargarDatos --formato arrow --directorio datos
 """
 
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
 from django.conf import settings
 from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
 from linea.models import Lineas, Puntos, LineaRuta, LineasPuntos
-import pandas as pd
+from linea.distancias import derivar_distancias
+from linea.formatos import FORMATOS, TABLAS, FuenteTablas, ruta_tabla
+from linea.red import invalidar_red
 import os
 
+import numpy as np
+
+
+TAMANO_LOTE = 1000  # filas por INSERT ... ON CONFLICT
+
+
+def texto(valor):
+    return str(valor).strip() if valor is not None else ''
+
+
+def enteros(valores):
+    return np.asarray(valores, dtype=np.int64)
+
+
+def reales(valores):
+    """Lista de floats para el ORM; los NaN (celdas vacías) se guardan como NULL."""
+    arreglo = np.asarray(valores, dtype=np.float64)
+    nulos = np.isnan(arreglo)
+    if not nulos.any():
+        return arreglo.tolist()
+    return np.where(nulos, None, arreglo).tolist()
+
 
 class Command(BaseCommand):
     help = 'Carga datos iniciales desde el archivo DatosLineas.xls'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sin-derivar',
+            action='store_true',
+            help='No calcular las distancias/tiempos que falten en la hoja',
+        )
+        parser.add_argument('--formato', choices=FORMATOS, default='excel')
+        parser.add_argument(
+            '--directorio',
+            default='datos',
+            help='Directorio con los archivos parquet/arrow (relativo a BASE_DIR)',
+        )
+
     def handle(self, *args, **kwargs):
+        if kwargs['formato'] == 'excel':
+            fuente = self.fuente_excel()
+        else:
+            fuente = self.fuente_arrow(kwargs['formato'], kwargs['directorio'])
+        if fuente is None:
+            return
+        
+        self.stdout.write(self.style.SUCCESS(f'Leyendo: {fuente}\n'))
+        
+        # Cargar en orden: Lineas -> Puntos -> LineaRuta -> LineasPuntos
+        self.cargar_lineas(fuente)
+        self.cargar_puntos(fuente)
+        self.cargar_linea_ruta(fuente)
+        self.cargar_lineas_puntos(fuente)
+        self.reiniciar_secuencias()
+        
+        if not kwargs['sin_derivar']:
+            self.derivar_distancias()
+        
+        # Los workers en ejecución descartan sus geometrías y grafo en la siguiente verificación
+        invalidar_red()
+        
+        self.stdout.write(self.style.SUCCESS('\n✓ Proceso completado'))
+
+    def fuente_excel(self):
         # Buscar primero .xlsx, luego .xls
         excel_path_xlsx = os.path.join(settings.BASE_DIR, 'DatosLineas.xlsx')
         excel_path_xls = os.path.join(settings.BASE_DIR, 'DatosLineas.xls')
         
         if os.path.exists(excel_path_xlsx):
-            excel_path = excel_path_xlsx
-            engine = 'openpyxl'
             self.stdout.write('Usando engine: openpyxl (formato .xlsx)')
+            return FuenteTablas('excel', excel_path_xlsx, 'openpyxl')
         elif os.path.exists(excel_path_xls):
-            excel_path = excel_path_xls
-            engine = 'xlrd'
             self.stdout.write('Usando engine: xlrd (formato .xls)')
-        else:
-            self.stdout.write(self.style.ERROR(f'✗ Archivo no encontrado: DatosLineas.xls o DatosLineas.xlsx'))
-            return
+            return FuenteTablas('excel', excel_path_xls, 'xlrd')
         
-        self.stdout.write(self.style.SUCCESS(f'Leyendo archivo: {excel_path}\n'))
-        
-        # Cargar en orden: Lineas -> Puntos -> LineaRuta -> LineasPuntos
-        self.cargar_lineas(excel_path, engine)
-        self.cargar_puntos(excel_path, engine)
-        self.cargar_linea_ruta(excel_path, engine)
-        self.cargar_lineas_puntos(excel_path, engine)
-        
-        self.stdout.write(self.style.SUCCESS('\n✓ Proceso completado'))
+        self.stdout.write(self.style.ERROR(f'✗ Archivo no encontrado: DatosLineas.xls o DatosLineas.xlsx'))
+        return None
+
+    def fuente_arrow(self, formato, directorio):
+        directorio = os.path.join(settings.BASE_DIR, directorio)
+        faltantes = [t for t in TABLAS if not os.path.exists(ruta_tabla(directorio, t, formato))]
+        if faltantes:
+            self.stdout.write(self.style.ERROR(
+                f'✗ Faltan archivos {formato} en {directorio}: {", ".join(faltantes)}'
+            ))
+            return None
+        self.stdout.write(f'Usando formato: {formato} (memory-map)')
+        return FuenteTablas(formato, directorio)
+
+    # ----- Carga en bloque -----
+    #
+    # Cada tabla se lee como columnas, las referencias se validan con una sola
+    # consulta y las filas se escriben con bulk_create(update_conflicts=True),
+    # es decir, INSERT ... ON CONFLICT (id) DO UPDATE por lotes de TAMANO_LOTE.
 
-    def cargar_lineas(self, excel_path, engine):
+    def guardar(self, modelo, objetos, campos, etiqueta):
+        """Crea o actualiza `objetos` en bloque y escribe un resumen de la tabla."""
+        # Si un id se repite en la hoja gana la última fila, como con update_or_create
+        objetos = list({objeto.id: objeto for objeto in objetos}.values())
+        existentes = set(modelo.objects.values_list('id', flat=True))
+        with transaction.atomic():
+            modelo.objects.bulk_create(
+                objetos,
+                batch_size=TAMANO_LOTE,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=campos,
+            )
+        actualizadas = sum(1 for objeto in objetos if objeto.id in existentes)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {etiqueta}: {len(objetos)} filas ({len(objetos) - actualizadas} nuevas, {actualizadas} actualizadas)'
+        ))
+
+    def referencias_validas(self, modelo, ids, etiqueta):
+        """Máscara de las filas cuyo id de `modelo` existe en la base de datos."""
+        existentes = np.fromiter(modelo.objects.values_list('id', flat=True), dtype=np.int64)
+        validas = np.isin(ids, existentes)
+        if not validas.all():
+            faltantes = np.unique(ids[~validas])
+            muestra = faltantes[:10].tolist()
+            self.stdout.write(self.style.WARNING(
+                f'  ⚠ {len(faltantes)} {etiqueta} inexistentes, se omiten sus filas: '
+                f'{muestra}{" ..." if len(faltantes) > len(muestra) else ""}'
+            ))
+        return validas
+
+    def cargar_lineas(self, fuente):
         """Carga datos de la hoja Lineas"""
         try:
-            df_lineas = pd.read_excel(excel_path, sheet_name='Lineas', engine=engine)
-            self.stdout.write(f'\n📍 Cargando {len(df_lineas)} líneas...')
-            
-            for _, row in df_lineas.iterrows():
-                id_linea = int(row['IdLinea'])
-                nombre_linea = str(row['NombreLinea']).strip()
-                color_linea = str(row['ColorLinea']).strip()
-                
-                linea, created = Lineas.objects.update_or_create(
-                    id=id_linea,
-                    defaults={
-                        'nombreLinea': nombre_linea,
-                        'colorLinea': color_linea,
-                    }
+            tabla = fuente.columnas('Lineas')
+            self.stdout.write(f'\n📍 Cargando {len(tabla["IdLinea"])} líneas...')
+
+            lineas = [
+                Lineas(id=id_linea, nombreLinea=texto(nombre), colorLinea=texto(color))
+                for id_linea, nombre, color in zip(
+                    enteros(tabla['IdLinea']).tolist(), tabla['NombreLinea'], tabla['ColorLinea'],
                 )
-                
-                # Manejar la imagen
-                imagen_filename = f"img_{nombre_linea}.png"
+            ]
+            self.guardar(Lineas, lineas, ['nombreLinea', 'colorLinea'], 'líneas')
+
+            # Imágenes: solo para las líneas que todavía no tienen una
+            sin_imagen = Lineas.objects.filter(
+                Q(imagenLinea='') | Q(imagenLinea__isnull=True), id__in=[linea.id for linea in lineas],
+            )
+            imagenes = 0
+            for linea in sin_imagen:
+                imagen_filename = f"img_{linea.nombreLinea}.png"
                 imagen_path = os.path.join(settings.MEDIA_ROOT, imagen_filename)
-                
-                if os.path.exists(imagen_path) and not linea.imagenLinea:
+                if os.path.exists(imagen_path):
                     with open(imagen_path, 'rb') as img_file:
-                        linea.imagenLinea.save(imagen_filename, File(img_file), save=False)
-                    linea.save()
-                
-                action = "Creada" if created else "Actualizada"
-                self.stdout.write(f'  {action}: ID={id_linea} - {nombre_linea}')
-            
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(df_lineas)} líneas procesadas'))
-            
+                        linea.imagenLinea.save(imagen_filename, File(img_file), save=True)
+                    imagenes += 1
+            if imagenes:
+                self.stdout.write(f'  {imagenes} imágenes asignadas')
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'✗ Error cargando Líneas: {e}'))
             import traceback
             traceback.print_exc()
 
-    def cargar_puntos(self, excel_path, engine):
+    def cargar_puntos(self, fuente):
         """Carga datos de la hoja Puntos"""
         try:
-            df_puntos = pd.read_excel(excel_path, sheet_name='Puntos', engine=engine)
-            self.stdout.write(f'\n📍 Cargando {len(df_puntos)} puntos...')
-            
-            for _, row in df_puntos.iterrows():
-                id_punto = int(row['IdPunto'])  # Corregido: IdPuto -> IdPunto
-                latitud = float(row['Latitud'])
-                longitud = float(row['Longitud'])
-                descripcion = str(row['Descripcion']).strip() if pd.notna(row['Descripcion']) else ''
-                
-                punto, created = Puntos.objects.update_or_create(
-                    id=id_punto,
-                    defaults={
-                        'latitud': latitud,
-                        'longitud': longitud,
-                        'descripcion': descripcion,
-                    }
+            tabla = fuente.columnas('Puntos')
+            self.stdout.write(f'\n📍 Cargando {len(tabla["IdPunto"])} puntos...')
+
+            puntos = [
+                Puntos(id=id_punto, latitud=latitud, longitud=longitud, descripcion=texto(descripcion))
+                for id_punto, latitud, longitud, descripcion in zip(
+                    enteros(tabla['IdPunto']).tolist(), reales(tabla['Latitud']), reales(tabla['Longitud']),
+                    tabla['Descripcion'],
                 )
-                
-                action = "Creado" if created else "Actualizado"
-                self.stdout.write(f'  {action}: ID={id_punto} - {descripcion}')
-            
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(df_puntos)} puntos procesados'))
-            
+            ]
+            self.guardar(Puntos, puntos, ['latitud', 'longitud', 'descripcion'], 'puntos')
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'✗ Error cargando Puntos: {e}'))
             import traceback
             traceback.print_exc()
 
-    def cargar_linea_ruta(self, excel_path, engine):
+    def cargar_linea_ruta(self, fuente):
         """Carga datos de la hoja LineaRuta"""
         try:
-            df_linea_ruta = pd.read_excel(excel_path, sheet_name='LineaRuta', engine=engine)
-            self.stdout.write(f'\n📍 Cargando {len(df_linea_ruta)} rutas de línea...')
-            
-            for _, row in df_linea_ruta.iterrows():
-                id_linea_ruta = int(row['IdLineaRuta'])
-                id_linea = int(row['IdLinea'])
-                id_ruta = str(row['IdRuta']).strip()  # Cambiado a string según tu modelo
-                descripcion = str(row['Descripcion']).strip() if pd.notna(row['Descripcion']) else ''
-                distancia = float(row['Distancia']) if pd.notna(row['Distancia']) else None
-                tiempo = float(row['Tiempo']) if pd.notna(row['Tiempo']) else None
-                
-                try:
-                    linea_obj = Lineas.objects.get(id=id_linea)
-                except Lineas.DoesNotExist:
-                    self.stdout.write(self.style.WARNING(f'  ⚠ Línea ID={id_linea} no existe, saltando...'))
-                    continue
-                
-                linea_ruta, created = LineaRuta.objects.update_or_create(
+            tabla = fuente.columnas('LineaRuta')
+            self.stdout.write(f'\n📍 Cargando {len(tabla["IdLineaRuta"])} rutas de línea...')
+
+            ids_linea = enteros(tabla['IdLinea'])
+            validas = self.referencias_validas(Lineas, ids_linea, 'líneas')
+            rutas = [
+                LineaRuta(
                     id=id_linea_ruta,
-                    defaults={
-                        'idlinea': linea_obj,  # Corregido: idLinea -> idlinea
-                        'idRuta': id_ruta,
-                        'descripcion': descripcion,
-                        'distancia': distancia,
-                        'tiempo': tiempo,
-                    }
+                    idlinea_id=id_linea,
+                    idRuta=texto(id_ruta),
+                    descripcion=texto(descripcion),
+                    distancia=distancia,
+                    tiempo=tiempo,
                 )
-                
-                action = "Creada" if created else "Actualizada"
-                self.stdout.write(f'  {action}: ID={id_linea_ruta} - {descripcion}')
-            
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(df_linea_ruta)} rutas procesadas'))
-            
+                for id_linea_ruta, id_linea, id_ruta, descripcion, distancia, tiempo, valida in zip(
+                    enteros(tabla['IdLineaRuta']).tolist(), ids_linea.tolist(), tabla['IdRuta'],
+                    tabla['Descripcion'], reales(tabla['Distancia']), reales(tabla['Tiempo']), validas.tolist(),
+                )
+                if valida
+            ]
+            self.guardar(LineaRuta, rutas, ['idlinea', 'idRuta', 'descripcion', 'distancia', 'tiempo'], 'rutas')
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'✗ Error cargando LineaRuta: {e}'))
             import traceback
             traceback.print_exc()
 
-    def cargar_lineas_puntos(self, excel_path, engine):
+    def cargar_lineas_puntos(self, fuente):
         """Carga datos de la hoja LineasPuntos"""
         try:
-            df_lineas_puntos = pd.read_excel(excel_path, sheet_name='LineasPuntos', engine=engine)
-            self.stdout.write(f'\n📍 Cargando {len(df_lineas_puntos)} relaciones línea-punto...')
-            
-            for _, row in df_lineas_puntos.iterrows():
-                id_linea_punto = int(row['IdLineaPunto'])
-                id_linea_ruta = int(row['IdLineaRuta'])
-                id_punto = int(row['IdPunto'])
-                orden = int(row['Orden'])
-                latitud = float(row['Latitud'])
-                longitud = float(row['Longitud'])
-                distancia = float(row['Distancia']) if pd.notna(row['Distancia']) else None
-                tiempo = float(row['Tiempo']) if pd.notna(row['Tiempo']) else None
-                
-                try:
-                    linea_ruta_obj = LineaRuta.objects.get(id=id_linea_ruta)
-                    punto_obj = Puntos.objects.get(id=id_punto)
-                except (LineaRuta.DoesNotExist, Puntos.DoesNotExist) as e:
-                    self.stdout.write(self.style.WARNING(f'  ⚠ Referencia no existe: {e}, saltando...'))
-                    continue
-                
-                linea_punto, created = LineasPuntos.objects.update_or_create(
+            tabla = fuente.columnas('LineasPuntos')
+            self.stdout.write(f'\n📍 Cargando {len(tabla["IdLineaPunto"])} relaciones línea-punto...')
+
+            ids_ruta = enteros(tabla['IdLineaRuta'])
+            ids_punto = enteros(tabla['IdPunto'])
+            validas = (
+                self.referencias_validas(LineaRuta, ids_ruta, 'rutas')
+                & self.referencias_validas(Puntos, ids_punto, 'puntos')
+            )
+            relaciones = [
+                LineasPuntos(
                     id=id_linea_punto,
-                    defaults={
-                        'idLineaRuta': linea_ruta_obj,
-                        'idPunto': punto_obj,
-                        'orden': orden,
-                        'latitud': latitud,
-                        'longitud': longitud,
-                        'distancia': distancia,
-                        'tiempo': tiempo,
-                    }
+                    idLineaRuta_id=id_ruta,
+                    idPunto_id=id_punto,
+                    orden=orden,
+                    latitud=latitud,
+                    longitud=longitud,
+                    distancia=distancia,
+                    tiempo=tiempo,
                 )
-                
-                action = "Creada" if created else "Actualizada"
-                self.stdout.write(f'  {action}: ID={id_linea_punto} - Orden {orden}')
-            
-            self.stdout.write(self.style.SUCCESS(f'✓ {len(df_lineas_puntos)} relaciones procesadas'))
-            
+                for id_linea_punto, id_ruta, id_punto, orden, latitud, longitud, distancia, tiempo, valida in zip(
+                    enteros(tabla['IdLineaPunto']).tolist(), ids_ruta.tolist(), ids_punto.tolist(),
+                    enteros(tabla['Orden']).tolist(), reales(tabla['Latitud']), reales(tabla['Longitud']),
+                    reales(tabla['Distancia']), reales(tabla['Tiempo']), validas.tolist(),
+                )
+                if valida
+            ]
+            self.guardar(
+                LineasPuntos, relaciones,
+                ['idLineaRuta', 'idPunto', 'orden', 'latitud', 'longitud', 'distancia', 'tiempo'],
+                'relaciones',
+            )
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'✗ Error cargando LineasPuntos: {e}'))
             import traceback
-            traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
+
+    def reiniciar_secuencias(self):
+        """
+        Los ids vienen de la hoja: en Postgres la secuencia de cada tabla se
+        ajusta al máximo id para que los registros creados por la API no choquen.
+        """
+        sentencias = connection.ops.sequence_reset_sql(no_style(), [Lineas, Puntos, LineaRuta, LineasPuntos])
+        if sentencias:
+            with connection.cursor() as cursor:
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
+
+    def derivar_distancias(self):
+        """Completa distancias y tiempos nulos a partir de las coordenadas"""
+        try:
+            self.stdout.write('\n📍 Calculando distancias y tiempos faltantes...')
+            resumen = derivar_distancias()
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {resumen["puntos"]} puntos y {resumen["rutas"]} rutas completados'
+            ))
+            
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'✗ Error calculando distancias: {e}'))
+            import traceback
+            traceback.print_exc()
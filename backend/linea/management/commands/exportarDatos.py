@@ -0,0 +1,51 @@
+"""
+Comando para exportar las tablas de la red a Excel, Parquet o Arrow IPC.
+Los archivos se vuelven a cargar con cargarDatos --formato <formato>.
+
+Ubicación: linea/management/commands/exportarDatos.py
+
+Uso:
+    python manage.py exportarDatos --formato parquet --directorio datos
+    python manage.py exportarDatos --formato arrow --directorio datos
+    python manage.py exportarDatos --formato excel   # genera datos/DatosLineas.xlsx
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from linea.formatos import FORMATOS, escribir_tablas, tablas_desde_bd
+
+
+class Command(BaseCommand):
+    help = 'Exporta Lineas, Puntos, LineaRuta y LineasPuntos a Excel, Parquet o Arrow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='parquet')
+        parser.add_argument(
+            '--directorio',
+            default='datos',
+            help='Directorio de salida (relativo a BASE_DIR)',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        directorio = os.path.join(settings.BASE_DIR, options['directorio'])
+        destino = directorio
+        if options['formato'] == 'excel':
+            os.makedirs(directorio, exist_ok=True)
+            destino = os.path.join(directorio, 'DatosLineas.xlsx')
+
+        tablas = tablas_desde_bd()
+        for nombre, columnas in tablas.items():
+            filas = len(next(iter(columnas.values()), []))
+            self.stdout.write(f'📍 {nombre}: {filas} filas')
+
+        archivos = escribir_tablas(tablas, options['formato'], destino)
+        for archivo in archivos:
+            self.stdout.write(f'  Escrito: {archivo}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Exportación {options["formato"]} completada en {time.perf_counter() - inicio:.2f}s'
+        ))
@@ -0,0 +1,210 @@
+"""
+Generador de carga local: simula pasajeros usando la API y mide capacidad.
+
+Ubicación: linea/management/commands/pruebaCarga.py
+
+No toca la base de datos: los Puntos y rutas se leen de la propia API, así que
+puede apuntar a cualquier servidor (p. ej. el stack de docker-compose). Todos los
+pasajeros comparten un event loop y un httpx.AsyncClient (una conexión keep-alive
+por pasajero). Conviene ejecutarlo fuera del contenedor del servidor, para no
+competir con él por la CPU.
+
+Uso:
+    python manage.py pruebaCarga --url http://localhost:8000/api
+    docker compose run --rm --no-deps -w /app/backend backend python manage.py pruebaCarga --url http://backend:8000/api
+    python manage.py pruebaCarga --etapas 1,10,50,100 --duracion 30 --mezcla all-data=1,viewsets=6,viaje=3
+"""
+
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from linea.geo import METROS_POR_GRADO, haversine_m
+
+
+MEZCLA_DEFECTO = 'all-data=1,viewsets=6,viaje=3'
+DISTANCIA_MINIMA_VIAJE = 500.0  # metros entre origen y destino
+INTENTOS_ORIGEN_DESTINO = 1000
+VIEWSETS = ('lineas', 'puntos', 'linea_ruta', 'lineas_puntos')
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga: simula tráfico de pasajeros contra la API y reporta latencias por endpoint'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/api', help='URL base de la API')
+        parser.add_argument('--etapas', default='1,5,10,25,50', help='Concurrencias de la rampa, separadas por coma')
+        parser.add_argument('--duracion', type=float, default=20.0, help='Segundos por etapa')
+        parser.add_argument('--mezcla', default=MEZCLA_DEFECTO, help='Proporción de cada tipo de llamada')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.url = options['url'].rstrip('/')
+        self.timeout = options['timeout']
+        self.rng = random.Random(options['semilla'])
+        etapas = [int(c) for c in options['etapas'].split(',') if c.strip()]
+        self.mezcla = self.leer_mezcla(options['mezcla'])
+
+        self.preparar_datos()
+        if self.mezcla.get('viaje'):
+            self.origen_destino()  # falla antes de la rampa si no hay pares de Puntos válidos
+        self.stdout.write(
+            f'🚦 {len(self.puntos)} puntos disponibles. Mezcla: '
+            + ', '.join(f'{k}={v:g}' for k, v in self.mezcla.items())
+        )
+
+        for concurrencia in etapas:
+            inicio = time.perf_counter()
+            resultados = asyncio.run(self.ejecutar_etapa(concurrencia, options['duracion']))
+            # Las llamadas en curso al vencer --duracion terminan después: se usa el tiempo real
+            self.reportar(concurrencia, time.perf_counter() - inicio, resultados)
+
+    # ----- Preparación -----
+
+    @staticmethod
+    def leer_mezcla(texto):
+        mezcla = {}
+        for parte in texto.split(','):
+            nombre, _, peso = parte.partition('=')
+            nombre = nombre.strip()
+            if nombre not in ('all-data', 'viewsets', 'viaje'):
+                raise CommandError(f'Tipo de llamada desconocido en --mezcla: {nombre}')
+            mezcla[nombre] = float(peso or 1)
+        if not any(mezcla.values()):
+            raise CommandError('--mezcla no puede tener todos los pesos en cero')
+        return mezcla
+
+    def preparar_datos(self):
+        try:
+            with httpx.Client(base_url=self.url, timeout=self.timeout) as cliente:
+                puntos = cliente.get('/puntos/').json()
+                rutas = cliente.get('/linea_ruta/').json()
+                lineas_puntos = cliente.get('/lineas_puntos/').json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise CommandError(f'No se pudo leer la API en {self.url}: {e}')
+        if not puntos:
+            raise CommandError('La API no devolvió Puntos. Ejecuta primero cargarDatos')
+
+        self.puntos = puntos
+        self.latitudes = np.array([p['latitud'] for p in puntos])
+        self.longitudes = np.array([p['longitud'] for p in puntos])
+        self.ids = {
+            'lineas': sorted({r['idlinea'] for r in rutas}) or [1],
+            'puntos': [p['id'] for p in puntos],
+            'linea_ruta': [r['id'] for r in rutas] or [1],
+            'lineas_puntos': [lp['id'] for lp in lineas_puntos] or [1],
+        }
+
+    def origen_destino(self):
+        """Par origen/destino cerca de dos Puntos al azar, separados al menos 500 m."""
+        for _ in range(INTENTOS_ORIGEN_DESTINO):
+            a, b = self.rng.randrange(len(self.puntos)), self.rng.randrange(len(self.puntos))
+            distancia = haversine_m(self.latitudes[a], self.longitudes[a], self.latitudes[b], self.longitudes[b])
+            if distancia >= DISTANCIA_MINIMA_VIAJE:
+                break
+        else:
+            raise CommandError(
+                f'No se encontraron dos Puntos separados al menos {DISTANCIA_MINIMA_VIAJE:g} m '
+                f'en {INTENTOS_ORIGEN_DESTINO} intentos; usa una --mezcla sin "viaje"'
+            )
+        # Los pasajeros no están justo en la parada: hasta ~150 m alrededor
+        desvio = 150.0 / METROS_POR_GRADO
+        return [
+            [self.latitudes[i] + self.rng.uniform(-desvio, desvio), self.longitudes[i] + self.rng.uniform(-desvio, desvio)]
+            for i in (a, b)
+        ]
+
+    def parada_cercana(self, coordenada):
+        distancias = haversine_m(coordenada[0], coordenada[1], self.latitudes, self.longitudes)
+        k = int(np.argmin(distancias))
+        return [float(self.latitudes[k]), float(self.longitudes[k])]
+
+    # ----- Llamadas -----
+
+    def generar_llamadas(self):
+        """Una acción de pasajero como lista de (endpoint, método, ruta, cuerpo)."""
+        tipo = self.rng.choices(list(self.mezcla), weights=list(self.mezcla.values()))[0]
+        if tipo == 'all-data':
+            return [('GET /all-data/', 'GET', '/all-data/', None)]
+
+        if tipo == 'viewsets':
+            recurso = self.rng.choice(VIEWSETS)
+            if self.rng.random() < 0.3:
+                return [(f'GET /{recurso}/', 'GET', f'/{recurso}/', None)]
+            id_objeto = self.rng.choice(self.ids[recurso])
+            return [(f'GET /{recurso}/<id>/', 'GET', f'/{recurso}/{id_objeto}/', None)]
+
+        # viaje: buses cercanos al origen + tramos a pie hacia/desde las paradas
+        origen, destino = self.origen_destino()
+        subida, bajada = self.parada_cercana(origen), self.parada_cercana(destino)
+        return [
+            (
+                'GET /vehiculos/cercanos/', 'GET',
+                f'/vehiculos/cercanos/?lat={origen[0]:.6f}&lon={origen[1]:.6f}&radio=800', None,
+            ),
+            (
+                'POST /caminata/', 'POST', '/caminata/',
+                {'tramos': [{'origen': origen, 'destino': subida}, {'origen': bajada, 'destino': destino}]},
+            ),
+        ]
+
+    async def llamar(self, cliente, metodo, ruta, cuerpo):
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.request(metodo, ruta, json=cuerpo)
+            ok = respuesta.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        return time.perf_counter() - inicio, ok
+
+    async def ejecutar_etapa(self, concurrencia, duracion):
+        loop = asyncio.get_running_loop()
+        fin = loop.time() + duracion
+        resultados = []  # (endpoint, segundos, ok)
+        # Cada pasajero hace una llamada a la vez: con una conexión por pasajero
+        # ninguna solicitud espera turno en el pool y la latencia medida es la del servidor
+        limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+
+        async with httpx.AsyncClient(base_url=self.url, timeout=self.timeout, limits=limites) as cliente:
+            async def pasajero():
+                while loop.time() < fin:
+                    for endpoint, metodo, ruta, cuerpo in self.generar_llamadas():
+                        segundos, ok = await self.llamar(cliente, metodo, ruta, cuerpo)
+                        resultados.append((endpoint, segundos, ok))
+
+            await asyncio.gather(*(pasajero() for _ in range(concurrencia)))
+        return resultados
+
+    # ----- Reporte -----
+
+    def reportar(self, concurrencia, duracion, resultados):
+        """`duracion` es el tiempo medido de la etapa en segundos."""
+        total = len(resultados)
+        errores = sum(1 for _, _, ok in resultados if not ok)
+        self.stdout.write(self.style.SUCCESS(
+            f'\n▶ Concurrencia {concurrencia}: {total} solicitudes, {total / duracion:.1f} req/s, '
+            f'errores {100.0 * errores / max(total, 1):.1f}%'
+        ))
+        self.stdout.write(
+            f'  {"endpoint":<28}{"n":>7}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"error %":>9}'
+        )
+
+        por_endpoint = {}
+        for endpoint, segundos, ok in resultados:
+            por_endpoint.setdefault(endpoint, []).append((segundos, ok))
+
+        for endpoint in sorted(por_endpoint):
+            datos = por_endpoint[endpoint]
+            latencias = np.array([s for s, _ in datos]) * 1000.0
+            p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+            fallidas = sum(1 for _, ok in datos if not ok)
+            self.stdout.write(
+                f'  {endpoint:<28}{len(datos):>7}{len(datos) / duracion:>9.1f}'
+                f'{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{100.0 * fallidas / len(datos):>9.1f}'
+            )
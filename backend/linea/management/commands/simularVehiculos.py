@@ -0,0 +1,121 @@
+"""
+Simulador local de vehículos: recorre las rutas cargadas generando pings GPS
+sintéticos (con ruido) y los envía a la ingesta en tiempo real.
+
+Ubicación: linea/management/commands/simularVehiculos.py
+
+Uso:
+    # En proceso, lo más rápido posible (mide el rendimiento del emparejamiento)
+    python manage.py simularVehiculos --vehiculos-por-ruta 50 --ticks 100
+
+    # Contra un servidor en ejecución, un lote por intervalo
+    python manage.py simularVehiculos --url http://localhost:8000/api --intervalo 1
+"""
+
+import time
+
+import numpy as np
+import requests
+from django.core.management.base import BaseCommand
+
+from linea.geo import desde_plano
+from linea.tiempo_real import registro
+
+
+class Command(BaseCommand):
+    help = 'Simula vehículos recorriendo las rutas y envía sus posiciones a la ingesta en tiempo real'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehiculos-por-ruta', type=int, default=5)
+        parser.add_argument('--ticks', type=int, default=60, help='Cantidad de lotes a enviar')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos simulados entre pings')
+        parser.add_argument('--velocidad', type=float, default=20.0, help='Velocidad media en km/h')
+        parser.add_argument('--ruido', type=float, default=8.0, help='Error GPS (desvío estándar en metros)')
+        parser.add_argument('--url', help='URL base de la API; si se omite se ingiere en proceso')
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['semilla'])
+        geometrias = [g for g in registro.precargar_geometrias().values() if g is not None]
+        if not geometrias:
+            self.stdout.write(self.style.ERROR('✗ No hay rutas con puntos. Ejecuta primero cargarDatos'))
+            return
+
+        vehiculos = self.crear_vehiculos(geometrias, options['vehiculos_por_ruta'], rng)
+        paso = options['velocidad'] / 3.6 * options['intervalo']  # metros por tick
+        self.stdout.write(
+            f'🚌 Simulando {len(vehiculos)} vehículos en {len(geometrias)} rutas '
+            f'({options["ticks"]} ticks)...'
+        )
+
+        sesion = requests.Session() if options['url'] else None
+        total = aceptados = 0
+        desvios = []
+        inicio = time.perf_counter()
+        ahora = time.time()
+
+        for tick in range(options['ticks']):
+            pings = self.generar_pings(vehiculos, ahora + tick * options['intervalo'], options['ruido'], rng)
+            total += len(pings)
+
+            if sesion is None:
+                n, _ = registro.ingerir(pings)
+                aceptados += n
+            else:
+                t0 = time.perf_counter()
+                respuesta = sesion.post(f'{options["url"].rstrip("/")}/vehiculos/posiciones/', json=pings, timeout=30)
+                aceptados += respuesta.json().get('aceptados', 0)
+                restante = options['intervalo'] - (time.perf_counter() - t0)
+                if restante > 0:
+                    time.sleep(restante)
+
+            for v in vehiculos:
+                v['avance'] = (v['avance'] + paso * v['factor']) % v['geometria'].largo_total
+
+        duracion = time.perf_counter() - inicio
+
+        if sesion is None:
+            for v in vehiculos:
+                estado = registro.ultimo(v['id'])
+                if estado is not None:
+                    desvios.append(estado.desvio)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {aceptados}/{total} pings aceptados en {duracion:.2f}s '
+            f'({total / duracion:,.0f} pings/s)'
+        ))
+        if desvios:
+            self.stdout.write(f'  Desvío medio respecto a la ruta: {np.mean(desvios):.1f} m')
+
+    @staticmethod
+    def crear_vehiculos(geometrias, por_ruta, rng):
+        vehiculos = []
+        for geometria in geometrias:
+            largo = geometria.largo_total
+            for n in range(por_ruta):
+                vehiculos.append({
+                    'id': f'R{geometria.id_linea_ruta}-{n:03d}',
+                    'geometria': geometria,
+                    'avance': rng.uniform(0, largo),
+                    'factor': rng.uniform(0.7, 1.3),  # cada vehículo va a su propio ritmo
+                })
+        return vehiculos
+
+    @staticmethod
+    def generar_pings(vehiculos, timestamp, ruido, rng):
+        pings = []
+        for v in vehiculos:
+            g = v['geometria']
+            s = min(max(np.searchsorted(g.acumulado, v['avance'], side='right') - 1, 0), len(g.largos) - 1)
+            t = (v['avance'] - g.acumulado[s]) / g.largos[s] if g.largos[s] else 0.0
+            x = g.ax[s] + t * g.dx[s] + rng.normal(0, ruido)
+            y = g.ay[s] + t * g.dy[s] + rng.normal(0, ruido)
+            lat, lon = desde_plano(x, y, g.lat0, g.lon0)
+            pings.append({
+                'vehiculo': v['id'],
+                'idLineaRuta': g.id_linea_ruta,
+                'latitud': float(lat),
+                'longitud': float(lon),
+                'timestamp': timestamp,
+            })
+        return pings
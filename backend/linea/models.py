@@ -24,7 +24,7 @@ class LineaRuta(models.Model):
     idRuta = models.CharField(max_length=1, null=False, blank=False)
     descripcion = models.CharField(max_length=100, null=True, blank=True)
     distancia = models.FloatField(null=True, blank=True)  # in kilometers
-    tiempo = models.FloatField(null=True, blank=True)  # in minutes
+    tiempo = models.FloatField(null=True, blank=True)  # in hours
     
     
     def __str__(self):
@@ -36,8 +36,17 @@ class LineasPuntos(models.Model):
     orden = models.IntegerField(null=False, blank=False)
     latitud = models.FloatField(null=False, blank=False)
     longitud = models.FloatField(null=False, blank=False)
-    distancia = models.FloatField(null=True, blank=True)  # in kilometers
-    tiempo = models.FloatField(null=True, blank=True)  # in minutes
+    distancia = models.FloatField(null=True, blank=True)  # in meters, from the previous point
+    tiempo = models.FloatField(null=True, blank=True)  # in minutes, from the previous point
+    distanciaAcumulada = models.FloatField(null=True, blank=True)  # in meters, from the start of the route (derived)
     
     def __str__(self):
         return f"LineasPuntos({self.idLineaRuta.idlinea.nombreLinea} - {self.idLineaRuta.idRuta} - Punto Orden: {self.orden})"
+
+class VersionRed(models.Model):
+    # Una sola fila (pk=1), compartida por todos los workers; ver linea/red.py
+    version = models.PositiveBigIntegerField(default=1)
+    actualizada = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"VersionRed({self.version})"
@@ -0,0 +1,68 @@
+"""
+Versión de los datos de la red (líneas, puntos y rutas).
+
+La versión vive en la base de datos (modelo VersionRed, una sola fila), así que
+es la misma para todos los workers y sobrevive a los reinicios. Cada escritura
+a través de la API la incrementa una sola vez (por solicitud o por lote), igual
+que los comandos cargarDatos y calcularDistancias. Los clientes pueden comparar
+la versión (cabecera X-Version-Red de /api/all-data/) para saber si deben
+recargar.
+
+Cada worker guarda la última versión que vio; sincronizar_red() la compara con
+la de la base de datos (como mucho cada RED_VERIFICACION segundos) y descarta
+los cachés derivados de la geometría de las rutas si cambió.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from .caminata import reiniciar_router
+from .models import VersionRed
+from .tiempo_real import registro
+
+
+_estado = {'version': None, 'verificada': float('-inf')}
+_estado_lock = threading.Lock()
+
+
+def version_red():
+    """Versión actual de la red, leída de la base de datos."""
+    return VersionRed.objects.filter(pk=1).values_list('version', flat=True).first() or 1
+
+
+def invalidar_red():
+    """Incrementa la versión de la red y limpia los cachés derivados del proceso."""
+    if not VersionRed.objects.filter(pk=1).update(version=F('version') + 1):
+        VersionRed.objects.get_or_create(pk=1, defaults={'version': 2})
+    _limpiar_caches(version_red())
+
+
+def sincronizar_red(forzar=False):
+    """
+    Descarta los cachés del proceso si otro worker o un comando cambió la versión.
+    La primera vez solo registra la versión vigente.
+    """
+    with _estado_lock:
+        ahora = time.monotonic()
+        if not forzar and ahora - _estado['verificada'] < settings.RED_VERIFICACION:
+            return
+        _estado['verificada'] = ahora
+        conocida = _estado['version']
+
+    version = version_red()
+    if conocida is None:
+        with _estado_lock:
+            _estado['version'] = version
+    elif version != conocida:
+        _limpiar_caches(version)
+
+
+def _limpiar_caches(version):
+    with _estado_lock:
+        _estado['version'] = version
+        _estado['verificada'] = time.monotonic()
+    registro.invalidar_geometrias()
+    reiniciar_router(fuente='rutas')
@@ -1,3 +1,5 @@
+import math
+
 from rest_framework import serializers
 from .models import Lineas, Puntos, LineaRuta, LineasPuntos
 
@@ -21,4 +23,61 @@ class LineasPuntosSerializer(serializers.ModelSerializer):
     class Meta:
         model = LineasPuntos
         fields = '__all__'
-        
+
+
+def finito(valor):
+    # min_value/max_value no rechazan NaN
+    if not math.isfinite(valor):
+        raise serializers.ValidationError('Se esperaba un número finito')
+
+
+class PuntosRutaListSerializer(serializers.ListSerializer):
+    """Valida todos los idPunto del lote con una sola consulta."""
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('La ruta necesita al menos un punto')
+        ids = {item['idPunto'] for item in attrs}
+        puntos = Puntos.objects.in_bulk(ids)
+        faltantes = sorted(ids - puntos.keys())
+        if faltantes:
+            raise serializers.ValidationError(f'Puntos inexistentes: {faltantes}')
+        for item in attrs:
+            punto = puntos[item['idPunto']]
+            item.setdefault('latitud', punto.latitud)
+            item.setdefault('longitud', punto.longitud)
+        return attrs
+
+
+class PuntoRutaSerializer(serializers.Serializer):
+    """
+    Un punto dentro del reemplazo completo de una ruta. El orden lo da la
+    posición en la lista; latitud/longitud se copian del Punto si se omiten.
+    distancia/tiempo no se aceptan: se miden desde el punto anterior, así que
+    se recalculan siempre a partir del nuevo orden.
+    """
+    idPunto = serializers.IntegerField()
+    latitud = serializers.FloatField(required=False, min_value=-90.0, max_value=90.0, validators=[finito])
+    longitud = serializers.FloatField(required=False, min_value=-180.0, max_value=180.0, validators=[finito])
+
+    class Meta:
+        list_serializer_class = PuntosRutaListSerializer
+
+
+class CoordenadaField(serializers.ListField):
+    """[latitud, longitud]"""
+    child = serializers.FloatField()
+
+    def to_internal_value(self, data):
+        valor = super().to_internal_value(data)
+        if len(valor) != 2:
+            raise serializers.ValidationError('Se esperaba [latitud, longitud]')
+        lat, lon = valor
+        if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+            raise serializers.ValidationError('Coordenadas fuera de rango')
+        return [lat, lon]
+
+
+class TramoCaminataSerializer(serializers.Serializer):
+    origen = CoordenadaField()
+    destino = CoordenadaField()
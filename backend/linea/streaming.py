@@ -0,0 +1,124 @@
+"""
+Respuestas JSON en streaming para listados grandes.
+
+En vez de construir todas las instancias y pasarlas por ModelSerializer, se
+recorre el queryset con values_list(...).iterator(chunk_size) y cada bloque se
+codifica con orjson y se envía apenas está listo. La salida es idéntica a la
+del serializer (mismos campos, mismo orden), pero la memoria y el tiempo hasta
+el primer byte no dependen del tamaño de la tabla.
+
+Se activa con ?stream=1 en /api/all-data/ y en los listados de los viewsets.
+"""
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+
+
+VALORES_VERDADEROS = ('1', 'true', 'si', 'sí')
+
+
+def pide_streaming(request):
+    return request.query_params.get('stream', '').lower() in VALORES_VERDADEROS
+
+
+def columnas_serializer(serializer_class, request=None):
+    """
+    Traduce los campos de un ModelSerializer a (nombres, columnas de values_list,
+    conversiones) para reproducir su salida sin instanciar modelos.
+    """
+    modelo = serializer_class.Meta.model
+    nombres, columnas, conversiones = [], [], []
+    for nombre, campo in serializer_class().fields.items():
+        campo_modelo = modelo._meta.get_field(campo.source)
+        nombres.append(nombre)
+        columnas.append(campo_modelo.attname)  # FK -> <campo>_id, igual que PrimaryKeyRelatedField
+
+        if isinstance(campo, drf_fields.FileField):
+            conversiones.append(_convertir_archivo(campo_modelo.storage, request))
+        elif isinstance(campo, (drf_fields.DateField, drf_fields.DateTimeField)):
+            conversiones.append(lambda v: v.isoformat() if v is not None else None)
+        elif isinstance(campo, (drf_fields.CharField, serializers.ChoiceField)):
+            conversiones.append(lambda v: str(v) if v is not None else None)
+        else:
+            conversiones.append(None)
+    return nombres, columnas, conversiones
+
+
+def _convertir_archivo(storage, request):
+    def convertir(nombre):
+        if not nombre:
+            return None
+        url = storage.url(nombre)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convertir
+
+
+def filas_json(queryset, serializer_class, request=None, chunk_size=None):
+    """Genera el arreglo JSON del queryset en bloques de bytes."""
+    chunk_size = chunk_size or settings.STREAMING_CHUNK_SIZE
+    nombres, columnas, conversiones = columnas_serializer(serializer_class, request)
+    a_convertir = [(i, f) for i, f in enumerate(conversiones) if f is not None]
+
+    yield b'['
+    bloque = []
+    primero = True
+    for fila in queryset.values_list(*columnas).iterator(chunk_size=chunk_size):
+        if a_convertir:
+            fila = list(fila)
+            for i, convertir in a_convertir:
+                fila[i] = convertir(fila[i])
+        bloque.append(dict(zip(nombres, fila)))
+        if len(bloque) >= chunk_size:
+            yield (b'' if primero else b',') + orjson.dumps(bloque)[1:-1]
+            primero = False
+            bloque = []
+    if bloque:
+        yield (b'' if primero else b',') + orjson.dumps(bloque)[1:-1]
+    yield b']'
+
+
+def objeto_json(secciones):
+    """Une varios generadores de arreglos como {"clave": [...], ...}."""
+    yield b'{'
+    for i, (clave, generador) in enumerate(secciones):
+        yield (b',' if i else b'') + orjson.dumps(clave) + b':'
+        yield from generador
+    yield b'}'
+
+
+def respuesta_streaming(request, contenido, **kwargs):
+    """
+    StreamingHttpResponse que no acumula el contenido. Bajo ASGI el generador
+    (que consulta la base de datos) avanza bloque a bloque en el hilo de Django,
+    ya que Django 4.2 convertiría un iterador síncrono en una lista completa.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        contenido = _iterar_async(contenido)
+    return StreamingHttpResponse(contenido, content_type='application/json', **kwargs)
+
+
+async def _iterar_async(generador):
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            parte = await siguiente(generador, None)
+            if parte is None:
+                return
+            yield parte
+    finally:
+        await sync_to_async(generador.close, thread_sensitive=True)()
+
+
+class ListadoStreamingMixin:
+    """Agrega ?stream=1 a la acción list de un ModelViewSet."""
+
+    def list(self, request, *args, **kwargs):
+        if not pide_streaming(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return respuesta_streaming(request, filas_json(queryset, self.get_serializer_class(), request))
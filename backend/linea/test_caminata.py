@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .caminata import CacheCaminata, GrafoPeatonal, obtener_router, reiniciar_router
+from .geo import METROS_POR_GRADO
+from .tests import LATITUDES, LONGITUD, crear_red
+
+
+def grilla(n, paso=0.001):
+    """Grafo de n x n nodos separados `paso` grados, conectados en cruz."""
+    latitudes, longitudes, aristas = [], [], []
+    for i in range(n):
+        for j in range(n):
+            latitudes.append(i * paso)
+            longitudes.append(j * paso)
+            k = i * n + j
+            if j + 1 < n:
+                aristas.append((k, k + 1))
+            if i + 1 < n:
+                aristas.append((k, k + n))
+    return GrafoPeatonal(latitudes, longitudes, aristas, 'rutas', 'grilla')
+
+
+class NodoCercanoTests(TestCase):
+    def test_revisa_el_anillo_siguiente(self):
+        # Celdas de 0.002°: A cae en el primer anillo alrededor de la consulta y
+        # B en el segundo, pero B está más cerca (~290 m contra ~420 m)
+        grafo = GrafoPeatonal([0.0039, 0.0001], [0.0001, -0.0025], [(0, 1)], 'rutas', 'x')
+        nodo, distancia = grafo.nodo_cercano(0.0001, 0.0001)
+        self.assertEqual(nodo, 1)
+        self.assertAlmostEqual(distancia, 0.0026 * METROS_POR_GRADO, delta=1.0)
+
+    def test_sin_nodos_dentro_del_radio(self):
+        grafo = GrafoPeatonal([0.0, 0.0001], [0.0, 0.0], [(0, 1)], 'rutas', 'x')
+        self.assertIsNone(grafo.nodo_cercano(0.1, 0.1, radio_max=1000))
+
+    def test_ignora_nodos_sin_aristas(self):
+        grafo = GrafoPeatonal([0.0, 0.0, 0.01], [0.0, 0.0001, 0.0], [(1, 2)], 'rutas', 'x')
+        self.assertEqual(grafo.nodo_cercano(0.0, 0.0)[0], 1)
+
+
+class CaminoTests(TestCase):
+    def test_camino_mas_corto_en_la_grilla(self):
+        grafo = grilla(5)
+        distancia, nodos = grafo.camino(0, 24)
+        self.assertEqual((nodos[0], nodos[-1]), (0, 24))
+        self.assertEqual(len(nodos), 9)  # 8 pasos de Manhattan
+        self.assertAlmostEqual(distancia, 8 * 0.001 * METROS_POR_GRADO, delta=5.0)
+
+    def test_nodos_desconectados(self):
+        grafo = GrafoPeatonal([0.0, 0.001, 0.01, 0.011], [0.0] * 4, [(0, 1), (2, 3)], 'rutas', 'x')
+        self.assertIsNone(grafo.camino(0, 3))
+
+    def test_limite_de_nodos_expandidos(self):
+        grafo = grilla(20)
+        self.assertIsNotNone(grafo.camino(0, 399))
+        self.assertIsNone(grafo.camino(0, 399, max_nodos=10))
+
+
+class CacheCaminataTests(TestCase):
+    def test_purgar_borra_otras_firmas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            cache = CacheCaminata(os.path.join(directorio, 'c.sqlite3'))
+            cache.guardar('vieja', {(1, 2): (10.0, [1, 2])})
+            cache.guardar('nueva', {(1, 2): (12.0, [1, 3, 2])})
+
+            self.assertEqual(cache.purgar('nueva'), 1)
+            self.assertEqual(cache.obtener('vieja', [(1, 2)]), {})
+            self.assertEqual(cache.obtener('nueva', [(1, 2)]), {(1, 2): (12.0, [1, 3, 2])})
+
+
+class RutasCaminandoTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.cache = os.path.join(directorio.name, 'caminata.sqlite3')
+        configuracion = override_settings(
+            CAMINATA_OSM=os.path.join(directorio.name, 'no_existe.osm'),
+            CAMINATA_CACHE=self.cache,
+        )
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        reiniciar_router()
+        self.addCleanup(reiniciar_router)
+
+        crear_red()  # sin extracto OSM, el grafo sale de las calles de la ruta
+        self.client = APIClient()
+        # ~30 m al este del primer y del último punto de la ruta
+        desvio = 30.0 / METROS_POR_GRADO
+        self.tramo = {
+            'origen': [LATITUDES[0], LONGITUD + desvio],
+            'destino': [LATITUDES[2], LONGITUD + desvio],
+        }
+
+    def filas_cache(self):
+        with sqlite3.connect(self.cache) as conexion:
+            return conexion.execute('SELECT COUNT(*) FROM tramos').fetchone()[0]
+
+    def test_segunda_solicitud_usa_el_cache(self):
+        respuesta = self.client.post('/api/caminata/', {'tramos': [self.tramo]}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        tramo = respuesta.data['tramos'][0]
+        self.assertEqual(tramo['fuente'], 'rutas')
+        self.assertEqual(len(tramo['geometria']), 5)  # origen, 3 nodos, destino
+        self.assertEqual(self.filas_cache(), 1)
+
+        with mock.patch.object(GrafoPeatonal, 'camino') as camino:
+            repetida = self.client.post('/api/caminata/', {'tramos': [self.tramo]}, format='json')
+        camino.assert_not_called()
+        self.assertEqual(repetida.data, respuesta.data)
+
+    def test_tramo_demasiado_largo_es_linea_recta(self):
+        lejos = {'origen': self.tramo['origen'], 'destino': [LATITUDES[0] + 1.35, LONGITUD]}  # ~150 km
+        with mock.patch.object(GrafoPeatonal, 'camino') as camino:
+            respuesta = self.client.post('/api/caminata/', {'tramos': [lejos]}, format='json')
+        camino.assert_not_called()
+        self.assertEqual(respuesta.data['tramos'][0]['fuente'], 'linea_recta')
+        self.assertEqual(self.filas_cache(), 0)
+
+    def test_grafo_nuevo_purga_el_cache(self):
+        self.client.post('/api/caminata/', {'tramos': [self.tramo]}, format='json')
+        firma = obtener_router().grafo.firma
+        CacheCaminata(self.cache).guardar('firma-anterior', {(0, 1): (1.0, [0, 1])})
+
+        reiniciar_router()
+        obtener_router()
+        with sqlite3.connect(self.cache) as conexion:
+            firmas = {f for (f,) in conexion.execute('SELECT DISTINCT firma FROM tramos')}
+        self.assertEqual(firmas, {firma})
@@ -0,0 +1,46 @@
+import numpy as np
+from django.test import TestCase
+
+from .distancias import acumular, calcular_segmentos, derivar_distancias
+from .geo import haversine_m
+from .tests import crear_red
+
+
+class CalcularSegmentosTests(TestCase):
+    def test_reinicia_en_el_limite_de_cada_ruta(self):
+        rutas = np.array([1, 1, 1, 2, 2])
+        lats = np.array([0.0, 0.001, 0.002, 5.0, 5.001])
+        lons = np.zeros(5)
+
+        segmentos, acumulado, inicios = calcular_segmentos(rutas, lats, lons)
+
+        paso = haversine_m(0.0, 0.0, 0.001, 0.0)
+        np.testing.assert_array_equal(inicios, [0, 3])
+        # El primer punto de cada ruta no suma el salto desde la ruta anterior
+        np.testing.assert_allclose(segmentos, [0.0, paso, paso, 0.0, paso])
+        np.testing.assert_allclose(acumulado, [0.0, paso, 2 * paso, 0.0, paso])
+
+    def test_sin_puntos(self):
+        segmentos, acumulado, inicios = calcular_segmentos(np.array([]), np.array([]), np.array([]))
+        self.assertEqual((len(segmentos), len(acumulado), len(inicios)), (0, 0, 0))
+
+    def test_acumular_no_suma_el_primer_punto_de_cada_ruta(self):
+        # La distancia del primer punto puede venir de la hoja con un valor distinto de 0
+        acumulado = acumular(np.array([7.0, 10.0, 5.0, 3.0, 2.0]), np.array([0, 3]))
+        np.testing.assert_allclose(acumulado, [0.0, 10.0, 15.0, 0.0, 2.0])
+
+
+class DerivarDistanciasTests(TestCase):
+    def test_guarda_la_distancia_acumulada(self):
+        _, ruta, _ = crear_red()
+
+        derivar_distancias()
+
+        filas = list(ruta.puntos.order_by('orden').values_list('distancia', 'distanciaAcumulada'))
+        self.assertEqual(filas[0], (0.0, 0.0))
+        self.assertAlmostEqual(filas[2][1], filas[1][0] + filas[2][0], places=2)
+        ruta.refresh_from_db()
+        self.assertAlmostEqual(ruta.distancia, round(filas[2][1] / 1000.0, 2))
+
+        # Un segundo cálculo no encuentra nada que actualizar
+        self.assertEqual(derivar_distancias(), {'puntos': 0, 'rutas': 0})
@@ -0,0 +1,37 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .distancias import derivar_distancias
+from .formatos import tablas_desde_bd
+from .models import Lineas, Puntos, LineaRuta, LineasPuntos
+from .tests import crear_red
+
+
+class IdaYVueltaTests(TestCase):
+    """exportarDatos seguido de cargarDatos deja las tablas como estaban."""
+
+    def setUp(self):
+        crear_red()
+        # Un punto sin ruta y una ruta sin distancia: columnas con nulos
+        Puntos.objects.create(latitud=-17.790, longitud=-63.190, descripcion='Suelto')
+        derivar_distancias()
+        LineaRuta.objects.create(idlinea=Lineas.objects.get(), idRuta='B', descripcion='Vuelta')
+        self.esperado = tablas_desde_bd()
+
+    def vaciar(self):
+        for modelo in (LineasPuntos, LineaRuta, Puntos, Lineas):
+            modelo.objects.all().delete()
+
+    def test_parquet_y_arrow(self):
+        for formato in ('parquet', 'arrow'):
+            with self.subTest(formato=formato), tempfile.TemporaryDirectory() as directorio:
+                call_command('exportarDatos', formato=formato, directorio=directorio, stdout=StringIO())
+                self.vaciar()
+                salida = StringIO()
+                call_command('cargarDatos', formato=formato, directorio=directorio, stdout=salida)
+
+                self.assertNotIn('✗', salida.getvalue())
+                self.assertEqual(tablas_desde_bd(), self.esperado)
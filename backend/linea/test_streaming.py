@@ -0,0 +1,30 @@
+import json
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .tests import crear_red
+
+
+class StreamingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        crear_red()
+
+    def leer(self, respuesta):
+        return json.loads(b''.join(respuesta.streaming_content))
+
+    def test_all_data_stream_igual_al_serializer(self):
+        normal = self.client.get('/api/all-data/')
+        streaming = self.client.get('/api/all-data/?stream=1')
+
+        self.assertTrue(streaming.streaming)
+        self.assertEqual(self.leer(streaming), json.loads(normal.content))
+        self.assertEqual(streaming['X-Version-Red'], normal['X-Version-Red'])
+
+    def test_listados_stream_iguales_al_serializer(self):
+        for recurso in ('lineas', 'puntos', 'linea_ruta', 'lineas_puntos'):
+            with self.subTest(recurso=recurso):
+                normal = self.client.get(f'/api/{recurso}/')
+                streaming = self.client.get(f'/api/{recurso}/?stream=1')
+                self.assertEqual(self.leer(streaming), json.loads(normal.content))
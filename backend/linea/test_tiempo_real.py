@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .geo import METROS_POR_GRADO
+from .tests import LATITUDES, LONGITUD, crear_red
+from .tiempo_real import GeometriaRuta, RegistroVehiculos, registro
+
+
+class TiempoRealTests(TestCase):
+    def setUp(self):
+        self.geometria = GeometriaRuta(
+            1, [10, 11, 12], [1, 2, 3], np.array(LATITUDES), np.array([LONGITUD] * 3),
+        )
+        self.registro = RegistroVehiculos(expiracion=60, radio_max=1000)
+        self.registro._geometrias[1] = self.geometria
+
+    def ping(self, vehiculo, lat, lon=LONGITUD, timestamp=None):
+        return {
+            'vehiculo': vehiculo, 'idLineaRuta': 1, 'latitud': lat, 'longitud': lon,
+            'timestamp': timestamp or time.time(),
+        }
+
+    def test_emparejar_proyecta_sobre_el_segmento_mas_cercano(self):
+        # ~20 m al este, a mitad del segundo segmento
+        lat = (LATITUDES[1] + LATITUDES[2]) / 2
+        lon = LONGITUD + 20.0 / (METROS_POR_GRADO * np.cos(np.radians(lat)))
+        segmento, lat_ruta, lon_ruta, desvio, avance = self.geometria.emparejar(np.array([lat]), np.array([lon]))
+
+        self.assertEqual(segmento[0], 1)
+        self.assertAlmostEqual(lat_ruta[0], lat, places=6)
+        self.assertAlmostEqual(lon_ruta[0], LONGITUD, places=6)
+        self.assertAlmostEqual(desvio[0], 20.0, delta=0.5)
+        self.assertAlmostEqual(avance[0], 1.5 * self.geometria.largos[0], delta=0.5)
+
+    def test_cercanos_ordena_por_distancia_y_respeta_el_radio(self):
+        aceptados, rechazados = self.registro.ingerir([
+            self.ping('lejos', LATITUDES[2]),
+            self.ping('cerca', LATITUDES[0]),
+            self.ping('fuera', LATITUDES[0] + 0.05),
+        ])
+        self.assertEqual((aceptados, rechazados), (3, []))
+
+        cercanos = self.registro.cercanos(LATITUDES[0], LONGITUD, 500)
+        self.assertEqual([estado.vehiculo for estado, _ in cercanos], ['cerca', 'lejos'])
+        self.assertLess(cercanos[0][1], cercanos[1][1])
+
+    def test_cercanos_limita_el_radio_y_rechaza_no_finitos(self):
+        self.registro.ingerir([self.ping('fuera', LATITUDES[0] + 0.05)])  # ~5.5 km
+        self.assertEqual(self.registro.cercanos(LATITUDES[0], LONGITUD, 2_000_000), [])
+        with self.assertRaises(ValueError):
+            self.registro.cercanos(LATITUDES[0], LONGITUD, float('nan'))
+
+    def test_ping_atrasado_se_reporta_como_rechazado(self):
+        ahora = time.time()
+        self.registro.ingerir([self.ping('bus', LATITUDES[1], timestamp=ahora)])
+        aceptados, rechazados = self.registro.ingerir([self.ping('bus', LATITUDES[0], timestamp=ahora - 10)])
+
+        self.assertEqual(aceptados, 0)
+        self.assertEqual([r['indice'] for r in rechazados], [0])
+        self.assertEqual(self.registro.ultimo('bus').latitud, LATITUDES[1])
+
+    def test_rechaza_timestamps_futuros(self):
+        aceptados, rechazados = self.registro.ingerir([
+            self.ping('ms', LATITUDES[0], timestamp=time.time() * 1000),
+            self.ping('lejano', LATITUDES[0], timestamp=1e30),
+        ])
+        self.assertEqual(aceptados, 0)
+        self.assertEqual([r['indice'] for r in rechazados], [0, 1])
+        self.assertEqual(self.registro._estados, {})
+
+    def test_timestamp_cero_no_significa_ahora(self):
+        ping = self.ping('bus', LATITUDES[0])
+        ping['timestamp'] = 0
+        self.registro.ingerir([ping])
+        self.assertEqual(self.registro.ultimo('bus').timestamp, 0.0)
+
+        del ping['timestamp']
+        self.registro.ingerir([ping])
+        self.assertAlmostEqual(self.registro.ultimo('bus').timestamp, time.time(), delta=5)
+
+    def test_vehiculos_expirados_se_eliminan(self):
+        self.registro.ingerir([self.ping('viejo', LATITUDES[0], timestamp=time.time() - 120)])
+        self.registro._ultima_purga -= self.registro.expiracion
+        self.registro.ingerir([self.ping('nuevo', LATITUDES[1])])
+
+        self.assertEqual(set(self.registro._estados), {'nuevo'})
+        self.assertEqual(set(self.registro._celda_de), {'nuevo'})
+        self.assertEqual(set().union(*self.registro._celdas.values()), {'nuevo'})
+
+    def test_api_cercanos_valida_parametros(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/vehiculos/cercanos/?lat=0&lon=0&radio=nan').status_code, 400)
+        self.assertEqual(client.get('/api/vehiculos/cercanos/?lat=95&lon=0').status_code, 400)
+        self.assertEqual(client.get('/api/vehiculos/cercanos/?lat=0&lon=0&radio=2000000').status_code, 200)
+
+    def test_api_ingesta_y_consulta(self):
+        _, ruta, _ = crear_red()
+        registro.limpiar()
+        registro.invalidar_geometrias()
+        self.addCleanup(registro.limpiar)
+        self.addCleanup(registro.invalidar_geometrias)
+        client = APIClient()
+        lat = (LATITUDES[1] + LATITUDES[2]) / 2  # dentro del segmento que empieza en orden 2
+
+        respuesta = client.post('/api/vehiculos/posiciones/', [
+            {'vehiculo': 'L1-01', 'idLineaRuta': ruta.id, 'latitud': lat, 'longitud': LONGITUD},
+            {'vehiculo': 'L1-02', 'idLineaRuta': 9999, 'latitud': LATITUDES[1], 'longitud': LONGITUD},
+        ], format='json')
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta.data['aceptados'], 1)
+        self.assertEqual([r['indice'] for r in respuesta.data['rechazados']], [1])
+
+        respuesta = client.get(f'/api/vehiculos/cercanos/?lat={LATITUDES[0]}&lon={LONGITUD}&radio=300')
+        self.assertEqual([v['vehiculo'] for v in respuesta.data], ['L1-01'])
+        self.assertEqual(respuesta.data[0]['orden'], 2)
@@ -1,3 +1,80 @@
+import json
+
+from django.conf import settings
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .distancias import derivar_distancias
+from .geo import haversine_m
+from .models import Lineas, Puntos, LineaRuta, LineasPuntos
+
+
+# Ruta de prueba: tres puntos hacia el norte, ~111 m entre cada uno
+LATITUDES = [-17.780, -17.779, -17.778]
+LONGITUD = -63.180
+
+
+def crear_red():
+    linea = Lineas.objects.create(nombreLinea='L1', colorLinea='#ff0000')
+    ruta = LineaRuta.objects.create(idlinea=linea, idRuta='A', descripcion='Ida')
+    puntos = [Puntos.objects.create(latitud=lat, longitud=LONGITUD, descripcion=f'P{i}') for i, lat in enumerate(LATITUDES)]
+    for orden, punto in enumerate(puntos, start=1):
+        LineasPuntos.objects.create(
+            idLineaRuta=ruta, idPunto=punto, orden=orden, latitud=punto.latitud, longitud=punto.longitud,
+        )
+    return linea, ruta, puntos
+
+
+class PuntosRutaTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.linea, self.ruta, self.puntos = crear_red()
+        self.url = f'/api/linea_ruta/{self.ruta.id}/puntos/'
+
+    def test_reemplazo_renumera_orden_y_deriva_totales(self):
+        p0, p1, p2 = self.puntos
+        respuesta = self.client.put(
+            self.url, [{'idPunto': p2.id}, {'idPunto': p0.id}, {'idPunto': p1.id}], format='json',
+        )
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([p['orden'] for p in respuesta.data], [1, 2, 3])
+        self.assertEqual([p['idPunto'] for p in respuesta.data], [p2.id, p0.id, p1.id])
+        self.assertEqual(LineasPuntos.objects.filter(idLineaRuta=self.ruta).count(), 3)
+
+        # p2 -> p0 son ~222 m y p0 -> p1 ~111 m
+        esperado_m = (
+            haversine_m(p2.latitud, LONGITUD, p0.latitud, LONGITUD)
+            + haversine_m(p0.latitud, LONGITUD, p1.latitud, LONGITUD)
+        )
+        self.assertEqual(respuesta.data[0]['distancia'], 0.0)
+        self.ruta.refresh_from_db()
+        self.assertAlmostEqual(self.ruta.distancia, round(esperado_m / 1000.0, 2))
+        self.assertAlmostEqual(self.ruta.tiempo, round(self.ruta.distancia / settings.VELOCIDAD_PROMEDIO_KMH, 2))
+
+    def test_ignora_distancias_del_cliente_al_reordenar(self):
+        # Flujo GET -> invertir -> PUT: los valores viejos se miden desde otro punto anterior
+        derivar_distancias()
+        puntos = self.client.get(self.url).data
+        self.assertGreater(puntos[-1]['distancia'], 0)
+        respuesta = self.client.put(self.url, puntos[::-1], format='json')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data[0]['distancia'], 0.0)
+        p0, p1, _ = self.puntos
+        self.assertAlmostEqual(
+            respuesta.data[-1]['distancia'],
+            round(haversine_m(p1.latitud, LONGITUD, p0.latitud, LONGITUD), 2),
+        )
+
+    def test_rechaza_puntos_inexistentes(self):
+        respuesta = self.client.put(self.url, [{'idPunto': self.puntos[0].id}, {'idPunto': 9999}], format='json')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('9999', json.dumps(respuesta.data))
+        # La ruta queda intacta
+        self.assertEqual(LineasPuntos.objects.filter(idLineaRuta=self.ruta).count(), 3)
 
-# Create your tests here.
+    def test_rechaza_coordenadas_fuera_de_rango(self):
+        respuesta = self.client.put(self.url, [{'idPunto': self.puntos[0].id, 'latitud': 91}], format='json')
+        self.assertEqual(respuesta.status_code, 400)
@@ -0,0 +1,341 @@
+"""
+Posiciones de vehículos en tiempo real.
+
+Los pings GPS se emparejan contra el segmento más cercano (`LineasPuntos`) de su
+`LineaRuta` y el estado se guarda solo en memoria:
+    - un buffer circular (deque) con los últimos N estados por vehículo
+    - un índice de celdas (grilla lat/lon) para responder "vehículos cercanos"
+
+Nada de esto se escribe en Postgres; el estado vive en el proceso que recibe los
+pings, por lo que la ingesta y las consultas deben atenderse desde el mismo worker.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from .geo import METROS_POR_GRADO, a_plano, desde_plano, haversine_m
+from .models import LineasPuntos
+
+
+EstadoVehiculo = namedtuple('EstadoVehiculo', [
+    'vehiculo',
+    'idLineaRuta',
+    'latitud',
+    'longitud',
+    'timestamp',
+    'idLineaPunto',      # LineasPuntos donde empieza el segmento emparejado
+    'orden',
+    'latitudRuta',       # posición proyectada sobre la ruta
+    'longitudRuta',
+    'desvio',            # metros entre el ping y la ruta
+    'avance',            # metros recorridos desde el inicio de la ruta
+])
+
+
+class ErrorPing(ValueError):
+    """Ping con datos inválidos."""
+
+
+class GeometriaRuta:
+    """Segmentos de una LineaRuta proyectados a un plano local en metros."""
+
+    def __init__(self, id_linea_ruta, ids, ordenes, latitudes, longitudes):
+        self.id_linea_ruta = id_linea_ruta
+        self.ids = np.asarray(ids)
+        self.ordenes = np.asarray(ordenes)
+        self.lat0 = float(np.mean(latitudes))
+        self.lon0 = float(np.mean(longitudes))
+
+        x, y = a_plano(latitudes, longitudes, self.lat0, self.lon0)
+        self.ax, self.ay = x[:-1], y[:-1]
+        self.dx, self.dy = np.diff(x), np.diff(y)
+        self.largo2 = self.dx ** 2 + self.dy ** 2
+        largos = np.sqrt(self.largo2)
+        self.acumulado = np.concatenate(([0.0], np.cumsum(largos)[:-1]))
+        self.largos = largos
+        self.largo_total = float(largos.sum())
+
+    @classmethod
+    def desde_bd(cls, id_linea_ruta):
+        filas = list(
+            LineasPuntos.objects
+            .filter(idLineaRuta_id=id_linea_ruta)
+            .order_by('orden')
+            .values_list('id', 'orden', 'latitud', 'longitud')
+        )
+        if len(filas) < 2:
+            return None
+        ids, ordenes, lats, lons = zip(*filas)
+        return cls(id_linea_ruta, ids, ordenes, np.array(lats), np.array(lons))
+
+    def emparejar(self, latitudes, longitudes):
+        """
+        Empareja un lote de posiciones contra todos los segmentos a la vez
+        (matriz pings x segmentos) y devuelve, por ping, el índice del segmento,
+        la posición proyectada, el desvío y el avance sobre la ruta.
+        """
+        px, py = a_plano(latitudes, longitudes, self.lat0, self.lon0)
+        px, py = px[:, None], py[:, None]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = ((px - self.ax) * self.dx + (py - self.ay) * self.dy) / self.largo2
+        t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+        qx = self.ax + t * self.dx
+        qy = self.ay + t * self.dy
+        dist2 = (px - qx) ** 2 + (py - qy) ** 2
+
+        filas = np.arange(dist2.shape[0])
+        segmento = np.argmin(dist2, axis=1)
+        t_sel = t[filas, segmento]
+        lat_ruta, lon_ruta = desde_plano(qx[filas, segmento], qy[filas, segmento], self.lat0, self.lon0)
+        desvio = np.sqrt(dist2[filas, segmento])
+        avance = self.acumulado[segmento] + t_sel * self.largos[segmento]
+        return segmento, lat_ruta, lon_ruta, desvio, avance
+
+
+class RegistroVehiculos:
+    """Estado en memoria de todos los vehículos, seguro entre hilos."""
+
+    def __init__(self, historial=20, tamano_celda=0.005, expiracion=120, radio_max=5000, tolerancia_futuro=30):
+        self.historial = historial
+        self.tamano_celda = tamano_celda  # en grados (~550 m)
+        self.expiracion = expiracion      # segundos sin pings antes de ocultar un vehículo
+        self.radio_max = radio_max        # metros; tope del radio de búsqueda en cercanos()
+        self.tolerancia_futuro = tolerancia_futuro  # segundos que un timestamp puede adelantarse al reloj
+        self._lock = threading.Lock()
+        self._estados = {}                # vehiculo -> deque[EstadoVehiculo]
+        self._celdas = {}                 # (i, j) -> set(vehiculo)
+        self._celda_de = {}               # vehiculo -> (i, j)
+        self._geometrias = {}             # idLineaRuta -> GeometriaRuta | None
+        self._ultima_purga = time.monotonic()
+
+    # ----- Geometría de rutas -----
+
+    def geometria(self, id_linea_ruta):
+        try:
+            return self._geometrias[id_linea_ruta]
+        except KeyError:
+            geometria = GeometriaRuta.desde_bd(id_linea_ruta)
+            self._geometrias[id_linea_ruta] = geometria
+            return geometria
+
+    def precargar_geometrias(self):
+        """Carga la geometría de todas las rutas en una sola consulta."""
+        filas = (
+            LineasPuntos.objects
+            .order_by('idLineaRuta_id', 'orden')
+            .values_list('idLineaRuta_id', 'id', 'orden', 'latitud', 'longitud')
+        )
+        por_ruta = {}
+        for id_ruta, *resto in filas:
+            por_ruta.setdefault(id_ruta, []).append(resto)
+        geometrias = {}
+        for id_ruta, puntos in por_ruta.items():
+            if len(puntos) < 2:
+                geometrias[id_ruta] = None
+                continue
+            ids, ordenes, lats, lons = zip(*puntos)
+            geometrias[id_ruta] = GeometriaRuta(id_ruta, ids, ordenes, np.array(lats), np.array(lons))
+        self._geometrias = geometrias
+        return geometrias
+
+    def invalidar_geometrias(self):
+        self._geometrias = {}
+
+    # ----- Ingesta -----
+
+    def _celda(self, lat, lon):
+        return (int(lat // self.tamano_celda), int(lon // self.tamano_celda))
+
+    def _validar(self, ping):
+        try:
+            vehiculo = str(ping['vehiculo'])
+            id_linea_ruta = int(ping['idLineaRuta'])
+            lat = float(ping['latitud'])
+            lon = float(ping['longitud'])
+            # Solo un timestamp ausente (o null) significa "ahora"; 0 es un valor válido
+            timestamp = ping.get('timestamp')
+            timestamp = time.time() if timestamp is None else float(timestamp)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ErrorPing(f'Ping inválido: {e}')
+        if not vehiculo or not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+            raise ErrorPing('Vehículo vacío o coordenadas fuera de rango')
+        if not np.isfinite(timestamp):
+            raise ErrorPing('Timestamp inválido')
+        if timestamp > time.time() + self.tolerancia_futuro:
+            # Un timestamp futuro quedaría como el estado más reciente y haría
+            # descartar como atrasados todos los pings reales del vehículo
+            raise ErrorPing('Timestamp en el futuro (se esperan segundos Unix, no milisegundos)')
+        return vehiculo, id_linea_ruta, lat, lon, timestamp
+
+    def ingerir(self, pings):
+        """
+        Procesa un lote de pings. Devuelve (aceptados, rechazados) donde
+        rechazados es una lista de {'indice', 'error'}. Los pings más viejos que
+        la última posición guardada del vehículo se descartan como rechazados.
+        """
+        rechazados = []
+        por_ruta = {}
+        for indice, ping in enumerate(pings):
+            try:
+                validado = self._validar(ping)
+            except ErrorPing as e:
+                rechazados.append({'indice': indice, 'error': str(e)})
+                continue
+            por_ruta.setdefault(validado[1], []).append((indice, validado))
+
+        nuevos = []
+        for id_linea_ruta, grupo in por_ruta.items():
+            geometria = self.geometria(id_linea_ruta)
+            if geometria is None:
+                rechazados.extend(
+                    {'indice': indice, 'error': f'LineaRuta {id_linea_ruta} no existe o no tiene puntos'}
+                    for indice, _ in grupo
+                )
+                continue
+
+            lats = np.fromiter((v[2] for _, v in grupo), dtype=np.float64, count=len(grupo))
+            lons = np.fromiter((v[3] for _, v in grupo), dtype=np.float64, count=len(grupo))
+            segmento, lat_ruta, lon_ruta, desvio, avance = geometria.emparejar(lats, lons)
+
+            for k, (indice, (vehiculo, _, lat, lon, timestamp)) in enumerate(grupo):
+                s = segmento[k]
+                nuevos.append((indice, EstadoVehiculo(
+                    vehiculo, id_linea_ruta, lat, lon, timestamp,
+                    int(geometria.ids[s]), int(geometria.ordenes[s]),
+                    float(lat_ruta[k]), float(lon_ruta[k]),
+                    float(desvio[k]), float(avance[k]),
+                )))
+
+        # En orden cronológico, para no descartar pings de un mismo lote que llegan desordenados
+        nuevos.sort(key=lambda par: par[1].timestamp)
+        aceptados = 0
+        with self._lock:
+            for indice, estado in nuevos:
+                if self._guardar(estado):
+                    aceptados += 1
+                else:
+                    rechazados.append({
+                        'indice': indice,
+                        'error': 'Ping atrasado: el vehículo ya tiene una posición más reciente',
+                    })
+            self._purgar_expirados()
+
+        rechazados.sort(key=lambda r: r['indice'])
+        return aceptados, rechazados
+
+    def _guardar(self, estado):
+        """Guarda el estado; devuelve False si es más viejo que el último del vehículo."""
+        buffer = self._estados.get(estado.vehiculo)
+        if buffer is None:
+            buffer = self._estados[estado.vehiculo] = deque(maxlen=self.historial)
+        elif buffer and buffer[-1].timestamp > estado.timestamp:
+            return False
+        buffer.append(estado)
+
+        celda = self._celda(estado.latitud, estado.longitud)
+        anterior = self._celda_de.get(estado.vehiculo)
+        if anterior != celda:
+            if anterior is not None:
+                vecinos = self._celdas.get(anterior)
+                if vecinos is not None:
+                    vecinos.discard(estado.vehiculo)
+                    if not vecinos:
+                        del self._celdas[anterior]
+            self._celdas.setdefault(celda, set()).add(estado.vehiculo)
+            self._celda_de[estado.vehiculo] = celda
+        return True
+
+    def _purgar_expirados(self):
+        """
+        Olvida los vehículos sin pings desde hace más de `expiracion` segundos.
+        Se llama con el lock tomado y recorre el registro como mucho una vez por
+        período de expiración.
+        """
+        if time.monotonic() - self._ultima_purga < self.expiracion:
+            return
+        self._ultima_purga = time.monotonic()
+        limite = time.time() - self.expiracion
+        expirados = [v for v, buffer in self._estados.items() if buffer[-1].timestamp < limite]
+        for vehiculo in expirados:
+            del self._estados[vehiculo]
+            celda = self._celda_de.pop(vehiculo, None)
+            vecinos = self._celdas.get(celda)
+            if vecinos is not None:
+                vecinos.discard(vehiculo)
+                if not vecinos:
+                    del self._celdas[celda]
+
+    # ----- Consultas -----
+
+    def ultimo(self, vehiculo):
+        with self._lock:
+            buffer = self._estados.get(vehiculo)
+            return buffer[-1] if buffer else None
+
+    def historial_de(self, vehiculo):
+        with self._lock:
+            return list(self._estados.get(vehiculo, ()))
+
+    def cercanos(self, lat, lon, radio, id_linea_ruta=None, limite=50):
+        """Vehículos activos a menos de `radio` metros de (lat, lon), del más cercano al más lejano."""
+        if not (np.isfinite(lat) and np.isfinite(lon) and np.isfinite(radio)):
+            raise ValueError('lat, lon y radio deben ser números finitos')
+        radio = min(max(radio, 0.0), self.radio_max)
+        ahora = time.time()
+        lado = self.tamano_celda * METROS_POR_GRADO
+        alcance_lat = int(np.ceil(radio / lado))
+        alcance_lon = int(np.ceil(radio / (lado * max(np.cos(np.radians(lat)), 0.01))))
+        ci, cj = self._celda(lat, lon)
+
+        candidatos = []
+        with self._lock:
+            if (2 * alcance_lat + 1) * (2 * alcance_lon + 1) > len(self._celdas):
+                # Más celdas en el rectángulo que celdas ocupadas: recorrer solo las ocupadas
+                celdas = [
+                    vehiculos for (i, j), vehiculos in self._celdas.items()
+                    if abs(i - ci) <= alcance_lat and abs(j - cj) <= alcance_lon
+                ]
+            else:
+                celdas = [
+                    self._celdas.get((i, j), ())
+                    for i in range(ci - alcance_lat, ci + alcance_lat + 1)
+                    for j in range(cj - alcance_lon, cj + alcance_lon + 1)
+                ]
+            for vehiculos in celdas:
+                for vehiculo in vehiculos:
+                    estado = self._estados[vehiculo][-1]
+                    if ahora - estado.timestamp > self.expiracion:
+                        continue
+                    if id_linea_ruta is not None and estado.idLineaRuta != id_linea_ruta:
+                        continue
+                    candidatos.append(estado)
+
+        if not candidatos:
+            return []
+        distancias = haversine_m(
+            lat, lon,
+            np.fromiter((e.latitud for e in candidatos), dtype=np.float64, count=len(candidatos)),
+            np.fromiter((e.longitud for e in candidatos), dtype=np.float64, count=len(candidatos)),
+        )
+        orden = [k for k in np.argsort(distancias) if distancias[k] <= radio]
+        return [(candidatos[k], float(distancias[k])) for k in orden[:limite]]
+
+    def limpiar(self):
+        with self._lock:
+            self._estados.clear()
+            self._celdas.clear()
+            self._celda_de.clear()
+
+
+registro = RegistroVehiculos(
+    historial=settings.VEHICULOS_HISTORIAL,
+    tamano_celda=settings.VEHICULOS_TAMANO_CELDA,
+    expiracion=settings.VEHICULOS_EXPIRACION,
+    radio_max=settings.VEHICULOS_RADIO_MAX,
+    tolerancia_futuro=settings.VEHICULOS_TOLERANCIA_FUTURO,
+)
@@ -6,6 +6,10 @@ from .views import (
     LineaRutaViewSet,
     LineasPuntosViewSet,
     get_all_data,
+    ingerir_posiciones,
+    vehiculos_cercanos,
+    estado_vehiculo,
+    rutas_caminando,
 )
 
 router = DefaultRouter()
@@ -18,4 +22,8 @@ urlpatterns = router.urls
 
 urlpatterns += [
     path('all-data/', get_all_data, name='all-data'),
+    path('vehiculos/posiciones/', ingerir_posiciones, name='vehiculos-posiciones'),
+    path('vehiculos/cercanos/', vehiculos_cercanos, name='vehiculos-cercanos'),
+    path('vehiculos/<str:vehiculo>/', estado_vehiculo, name='vehiculos-estado'),
+    path('caminata/', rutas_caminando, name='caminata'),
 ]
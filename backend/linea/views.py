@@ -1,34 +1,183 @@
+import math
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
 from .models import Lineas, Puntos, LineaRuta, LineasPuntos
-from .serializer import LineasSerializer , PuntosSerializer, LineaRutaSerializer, LineasPuntosSerializer
+from .serializer import LineasSerializer , PuntosSerializer, LineaRutaSerializer, LineasPuntosSerializer, TramoCaminataSerializer, PuntoRutaSerializer
+from .tiempo_real import registro
+from .caminata import obtener_router
+from .distancias import derivar_distancias
+from .red import invalidar_red, sincronizar_red, version_red
+from .streaming import ListadoStreamingMixin, filas_json, objeto_json, pide_streaming, respuesta_streaming
 
 # Create your views here.
 
 
-class LineasViewSet(viewsets.ModelViewSet):
+class InvalidaRedMixin:
+    """Cada escritura invalida la versión de la red una vez, al confirmar la transacción."""
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        transaction.on_commit(invalidar_red)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        transaction.on_commit(invalidar_red)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        transaction.on_commit(invalidar_red)
+
+
+class LineasViewSet(InvalidaRedMixin, ListadoStreamingMixin, viewsets.ModelViewSet):
     queryset = Lineas.objects.all()
     serializer_class = LineasSerializer
 
 
-class PuntosViewSet(viewsets.ModelViewSet):
+class PuntosViewSet(InvalidaRedMixin, ListadoStreamingMixin, viewsets.ModelViewSet):
     queryset = Puntos.objects.all()
     serializer_class = PuntosSerializer
 
-class LineaRutaViewSet(viewsets.ModelViewSet):
+class LineaRutaViewSet(InvalidaRedMixin, ListadoStreamingMixin, viewsets.ModelViewSet):
     queryset = LineaRuta.objects.all()
     serializer_class = LineaRutaSerializer
+
+    @action(detail=True, methods=['get', 'put'], url_path='puntos', serializer_class=PuntoRutaSerializer)
+    def puntos(self, request, pk=None):
+        """
+        GET: puntos de la ruta en orden.
+        PUT: reemplaza toda la lista ordenada de puntos en una sola transacción;
+        `orden` se recalcula según la posición (1..n) y las distancias/tiempos
+        se derivan de las coordenadas en el nuevo orden.
+        """
+        linea_ruta = self.get_object()
+        if request.method == 'GET':
+            puntos = linea_ruta.puntos.order_by('orden')
+            return Response(LineasPuntosSerializer(puntos, many=True).data)
+
+        serializer = PuntoRutaSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # Bloquea la ruta: dos PUT concurrentes se aplican uno después del otro
+            # en vez de borrar cada uno solo lo que ve y terminar con ambas listas
+            linea_ruta = LineaRuta.objects.select_for_update().get(pk=linea_ruta.pk)
+            linea_ruta.puntos.all().delete()
+            LineasPuntos.objects.bulk_create([
+                LineasPuntos(
+                    idLineaRuta=linea_ruta,
+                    idPunto_id=item['idPunto'],
+                    orden=orden,
+                    latitud=item['latitud'],
+                    longitud=item['longitud'],
+                )
+                for orden, item in enumerate(serializer.validated_data, start=1)
+            ], batch_size=1000)
+            # La geometría cambió: los totales de la ruta se recalculan
+            LineaRuta.objects.filter(pk=linea_ruta.pk).update(distancia=None, tiempo=None)
+            derivar_distancias(rutas=[linea_ruta.pk])
+            transaction.on_commit(invalidar_red)
+
+        puntos = linea_ruta.puntos.order_by('orden')
+        return Response(LineasPuntosSerializer(puntos, many=True).data)
     
-class LineasPuntosViewSet(viewsets.ModelViewSet):
+class LineasPuntosViewSet(InvalidaRedMixin, ListadoStreamingMixin, viewsets.ModelViewSet):
     queryset = LineasPuntos.objects.all()
     serializer_class = LineasPuntosSerializer
     
 @api_view(['GET'])
 def get_all_data(request):
+    if pide_streaming(request):
+        return respuesta_streaming(request, objeto_json([
+            ('Lineas', filas_json(Lineas.objects.all(), LineasSerializer)),
+            ('Puntos', filas_json(Puntos.objects.all(), PuntosSerializer)),
+            ('LineaRuta', filas_json(LineaRuta.objects.all(), LineaRutaSerializer)),
+            ('LineasPuntos', filas_json(LineasPuntos.objects.all(), LineasPuntosSerializer)),
+        ]), headers={'X-Version-Red': str(version_red())})
+
     return Response({
         'Lineas': LineasSerializer(Lineas.objects.all(), many=True).data,
         'Puntos': PuntosSerializer(Puntos.objects.all(), many=True).data,
         'LineaRuta': LineaRutaSerializer(LineaRuta.objects.all(), many=True).data,
         'LineasPuntos': LineasPuntosSerializer(LineasPuntos.objects.all(), many=True).data,
-    })
\ No newline at end of file
+    }, headers={'X-Version-Red': str(version_red())})
+
+
+@api_view(['POST'])
+def ingerir_posiciones(request):
+    """Recibe un lote de pings GPS (lista de objetos o {'pings': [...]})."""
+    pings = request.data.get('pings') if isinstance(request.data, dict) else request.data
+    if not isinstance(pings, list):
+        return Response({'error': 'Se esperaba una lista de pings'}, status=status.HTTP_400_BAD_REQUEST)
+
+    sincronizar_red()
+    aceptados, rechazados = registro.ingerir(pings)
+    return Response(
+        {'aceptados': aceptados, 'rechazados': rechazados},
+        status=status.HTTP_202_ACCEPTED if aceptados else status.HTTP_400_BAD_REQUEST,
+    )
+
+
+@api_view(['GET'])
+def vehiculos_cercanos(request):
+    try:
+        lat = float(request.query_params['lat'])
+        lon = float(request.query_params['lon'])
+        radio = float(request.query_params.get('radio', 500))
+        id_linea_ruta = request.query_params.get('ruta')
+        id_linea_ruta = int(id_linea_ruta) if id_linea_ruta else None
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'Parámetros requeridos: lat, lon (opcionales: radio en metros, ruta)'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not all(math.isfinite(v) for v in (lat, lon, radio)) or radio < 0 \
+            or not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return Response({'error': 'lat, lon o radio fuera de rango'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # El registro limita el radio a settings.VEHICULOS_RADIO_MAX
+    cercanos = registro.cercanos(lat, lon, radio, id_linea_ruta)
+    return Response([
+        {**estado._asdict(), 'distancia': round(distancia, 1)}
+        for estado, distancia in cercanos
+    ])
+
+
+@api_view(['GET'])
+def estado_vehiculo(request, vehiculo):
+    historial = registro.historial_de(vehiculo)
+    if not historial:
+        return Response({'error': 'Vehículo sin posiciones recientes'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'actual': historial[-1]._asdict(),
+        'historial': [estado._asdict() for estado in historial],
+    })
+
+
+@api_view(['POST'])
+def rutas_caminando(request):
+    """
+    Calcula varios tramos a pie en una sola solicitud:
+        {"tramos": [{"origen": [lat, lon], "destino": [lat, lon]}, ...]}
+    """
+    tramos = request.data.get('tramos') if isinstance(request.data, dict) else None
+    if not isinstance(tramos, list) or not tramos:
+        return Response({'error': 'Se esperaba una lista "tramos"'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(tramos) > settings.CAMINATA_MAX_TRAMOS:
+        return Response(
+            {'error': f'Máximo {settings.CAMINATA_MAX_TRAMOS} tramos por solicitud'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = TramoCaminataSerializer(data=tramos, many=True)
+    serializer.is_valid(raise_exception=True)
+
+    sincronizar_red()
+    resultados = obtener_router().rutas([
+        (*tramo['origen'], *tramo['destino'])
+        for tramo in serializer.validated_data
+    ])
+    return Response({'tramos': resultados})
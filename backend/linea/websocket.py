@@ -0,0 +1,57 @@
+"""
+Ingesta de posiciones por WebSocket (ASGI puro, sin dependencias extra).
+
+Cada mensaje de texto es un ping o una lista de pings en JSON con el mismo
+formato que POST /api/vehiculos/posiciones/. El servidor responde a cada
+mensaje con {"aceptados": n, "rechazados": [...]}.
+
+Ruta: ws://<host>/ws/vehiculos/  (requiere servidor ASGI, p. ej. uvicorn)
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+
+from .red import sincronizar_red
+from .tiempo_real import registro
+
+
+@sync_to_async
+def ingerir(pings):
+    sincronizar_red()
+    return registro.ingerir(pings)
+
+
+async def posiciones_websocket(scope, receive, send):
+    evento = await receive()
+    if evento['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    while True:
+        evento = await receive()
+        if evento['type'] == 'websocket.disconnect':
+            return
+        if evento['type'] != 'websocket.receive':
+            continue
+
+        texto = evento.get('text')
+        if texto is None and evento.get('bytes') is not None:
+            texto = evento['bytes'].decode('utf-8', errors='replace')
+        try:
+            pings = json.loads(texto or '')
+        except ValueError:
+            await _responder(send, {'error': 'JSON inválido'})
+            continue
+        if isinstance(pings, dict):
+            pings = pings.get('pings', [pings])
+        if not isinstance(pings, list):
+            await _responder(send, {'error': 'Se esperaba una lista de pings'})
+            continue
+
+        aceptados, rechazados = await ingerir(pings)
+        await _responder(send, {'aceptados': aceptados, 'rechazados': rechazados})
+
+
+async def _responder(send, datos):
+    await send({'type': 'websocket.send', 'text': json.dumps(datos)})
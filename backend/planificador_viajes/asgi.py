@@ -13,4 +13,33 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'planificador_viajes.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.DEBUG:
+    # Igual que runserver: en desarrollo /static/ (CSS del admin) se sirve
+    # desde las apps, sin collectstatic
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    django_application = ASGIStaticFilesHandler(django_application)
+
+# Se importa después de inicializar Django (usa los modelos)
+from linea.websocket import posiciones_websocket  # noqa: E402
+
+WEBSOCKET_RUTAS = {
+    '/ws/vehiculos/': posiciones_websocket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        ruta = scope['path'] if scope['path'].endswith('/') else scope['path'] + '/'
+        manejador = WEBSOCKET_RUTAS.get(ruta)
+        if manejador is None:
+            await receive()  # websocket.connect
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        await manejador(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
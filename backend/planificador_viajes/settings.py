@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -84,6 +85,31 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'planificador_viajes.wsgi.application'
+ASGI_APPLICATION = 'planificador_viajes.asgi.application'
+
+# Posiciones de vehículos en tiempo real (solo en memoria, ver linea/tiempo_real.py)
+VEHICULOS_HISTORIAL = int(os.getenv('VEHICULOS_HISTORIAL', 20))  # estados guardados por vehículo
+VEHICULOS_TAMANO_CELDA = 0.005  # grados por celda del índice espacial (~550 m)
+VEHICULOS_EXPIRACION = int(os.getenv('VEHICULOS_EXPIRACION', 120))  # segundos
+VEHICULOS_RADIO_MAX = 5000  # metros; tope del radio en /api/vehiculos/cercanos/
+VEHICULOS_TOLERANCIA_FUTURO = 30  # segundos; pings con timestamp posterior se rechazan
+
+# Velocidad usada para estimar tiempos cuando la hoja no los trae (ver linea/distancias.py)
+VELOCIDAD_PROMEDIO_KMH = float(os.getenv('VELOCIDAD_PROMEDIO_KMH', 20))
+
+# Rutas a pie (ver linea/caminata.py). Sin extracto OSM se usan las calles de las rutas.
+CAMINATA_OSM = os.getenv('CAMINATA_OSM', os.path.join(BASE_DIR, 'mapas', 'peatonal.osm'))
+CAMINATA_CACHE = os.getenv('CAMINATA_CACHE', os.path.join(BASE_DIR, 'cache', 'caminata.sqlite3'))
+CAMINATA_VELOCIDAD_KMH = float(os.getenv('CAMINATA_VELOCIDAD_KMH', 4.5))
+CAMINATA_MAX_TRAMOS = 100  # tramos por solicitud
+CAMINATA_DISTANCIA_MAX = 3000  # metros en línea recta; tramos más largos se devuelven como línea recta
+CAMINATA_MAX_NODOS = 50000  # nodos que A* puede expandir por tramo antes de rendirse
+
+# Segundos entre consultas de la versión de la red por worker (ver linea/red.py)
+RED_VERIFICACION = 2
+
+# Filas por bloque en las respuestas ?stream=1 (ver linea/streaming.py)
+STREAMING_CHUNK_SIZE = int(os.getenv('STREAMING_CHUNK_SIZE', 2000))
 
 
 # Database
@@ -114,6 +140,11 @@ DATABASES = {
     }
 }
 
+# Las migraciones de linea no se versionan (bootstrap ejecuta makemigrations al
+# arrancar). En `manage.py test` las tablas se crean directo desde los modelos.
+if sys.argv[1:2] == ['test']:
+    MIGRATION_MODULES = {'linea': None}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
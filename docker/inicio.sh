@@ -8,31 +8,13 @@ fi
 
 cd /app/backend
 
-echo "🔄 Ejecutando makemigrations para todas las apps..."
-python manage.py makemigrations
+echo "🔄 Preparando base de datos, migraciones y superusuario..."
+python manage.py bootstrap || exit 1
 
-echo "🔄 Ejecutando migrate..."
-python manage.py migrate --noinput || exit 1
-
-until python manage.py showmigrations | grep "\[X\]"; do
-  echo "Esperando a que la base de datos esté lista..."
-  sleep 2
-done
-
-if ! python manage.py shell -c "from django.contrib.auth import get_user_model; User = get_user_model(); print(User.objects.filter(username='${DJANGO_SUPERUSER_USERNAME}').exists())" | grep -q True; then
-  echo "🛠️ Creando superusuario..."
-  python manage.py shell << END
-from django.contrib.auth import get_user_model
-User = get_user_model()
-User.objects.create_superuser(
-    "${DJANGO_SUPERUSER_USERNAME}",
-    "${DJANGO_SUPERUSER_EMAIL}",
-    "${DJANGO_SUPERUSER_PASSWORD}"
-)
-END
-else
-  echo "✅ Superusuario ya existe."
-fi
-
-echo "🚀 Iniciando Django..."
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# Desarrollo: uvicorn recarga al cambiar ./backend (montado por docker-compose),
+# sirve /static/ (DEBUG) y el WebSocket /ws/vehiculos/. Cada solicitud HTTP corre
+# en su propio hilo, así que una búsqueda a pie lenta no bloquea a las demás.
+# Sin --precalentar: cada recarga arranca un proceso nuevo y los cachés se llenan
+# con la primera solicitud. En producción ver README, sección 1.1.
+echo "🚀 Iniciando Django (uvicorn --reload)..."
+exec uvicorn planificador_viajes.asgi:application --host 0.0.0.0 --port 8000 --reload --reload-dir /app/backend